@@ -0,0 +1,68 @@
+# Copyright 2014 Tennessee Leeuwenburg
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+Synthetic series of known shapes, in graphite's form, for benchmarking.
+
+Each generator takes a length and a numpy random Generator, and returns the
+y values; series are spaced a minute apart from EPOCH_START.
+'''
+
+import numpy as np
+
+EPOCH_START = 1407109280
+STEP = 60
+
+
+def linear(length, rng):
+    return 2.5 * np.arange(length) + 100 + rng.normal(0, 0.01, length)
+
+
+def normal(length, rng):
+    positions = (np.arange(length) - length / 2) / max(length / 8, 1)
+    return 100 * np.exp(-positions ** 2 / 2) + rng.normal(0, 0.01, length)
+
+
+def random(length, rng):
+    return rng.uniform(0, 100, length)
+
+
+def single_point(length, rng):
+    # A single point, whatever the length asked for
+    return rng.uniform(0, 100, 1)
+
+
+SHAPES = {
+    'linear': linear,
+    'normal': normal,
+    'random': random,
+    'single-point': single_point,
+}
+
+
+def graphite_data(shape, length, count=1, seed=0):
+    '''
+    Return count series of the named shape, each of length points, as the
+    list of {'target', 'datapoints'} dicts graphite produces.
+    '''
+    rng = np.random.default_rng(seed)
+    data = []
+    for number in range(count):
+        y_values = SHAPES[shape](length, rng)
+        x_values = EPOCH_START + STEP * np.arange(len(y_values))
+        data.append({
+            'target': '{0}.{1}'.format(shape, number),
+            'datapoints': [[y, x] for y, x in zip(y_values.tolist(), x_values.tolist())],
+        })
+    return data
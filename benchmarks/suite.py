@@ -0,0 +1,322 @@
+# Copyright 2014 Tennessee Leeuwenburg
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+Benchmarks of each stage of the describe pipeline, swept over the length and
+number of series, with results as JSON:
+
+    $ python -m benchmarks --output before.json
+    $ python -m benchmarks --compare before.json
+
+The micro benchmarks (each analyser, get_analysis, with and without
+downsampling to MAX_POINTS, and the English realiser) analyse one series, so
+are swept over length only. The macro benchmarks (GraphiteGraph.auto_ingest,
+streaming.load_graphite, DescriptionCache.key and wordgraph.describe) are
+also swept over the number of series, each count_length points long. A cache
+key is only worth finding if it costs much less than the description.
+
+The [small] benchmarks read series of SMALL_LENGTH points, as graphite
+returns for many targets over a short time, with streaming.load_graphite
+and, for reference, with json.loads and Series.from_graphite.
+
+Each measurement reports the best and median seconds per call over repeat
+runs, after calibrating the number of calls per run with timeit.
+'''
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import timeit
+
+import numpy as np
+
+import wordgraph
+from wordgraph import analysers, grapher, streaming
+from wordgraph.points import Series
+from wordgraph.realiser import realiser
+
+from . import generators
+
+LENGTHS = [10, 100, 1000, 10000, 100000, 1000000]
+COUNTS = [1, 10, 100, 1000]
+COUNT_LENGTH = 1000
+QUICK_LENGTHS = [10, 1000]
+QUICK_COUNTS = [1, 10]
+# The max_points given to get_analysis by its downsampled benchmarks
+MAX_POINTS = 1000
+# The length of each series in the [small] benchmarks
+SMALL_LENGTH = 6
+
+
+def _context(data):
+    return analysers.SeriesContext.from_points(Series.from_graphite(data[0]['datapoints']))
+
+
+def _analyser(analyser):
+    def setup(data):
+        context = _context(data)
+        # A new analyser each call, as evaluate() memoises its result
+        return lambda: analyser(context).evaluate()
+    return setup
+
+
+def _get_analysis(data):
+    values = Series.from_graphite(data[0]['datapoints'])
+    return lambda: analysers.get_analysis(values)
+
+
+def _get_analysis_reduced(downsample):
+    def setup(data):
+        values = Series.from_graphite(data[0]['datapoints'])
+        return lambda: analysers.get_analysis(values, max_points=MAX_POINTS,
+                downsample=downsample)
+    return setup
+
+
+def _structure(data):
+    graph = grapher.GraphiteGraph()
+    graph.auto_ingest({'graphite_data': data})
+    return graph.as_dict()
+
+
+def _english_long(data):
+    structure = _structure(data)
+    return lambda: realiser.English(structure).long()
+
+
+def _english_short(data):
+    structure = _structure(data)
+    return lambda: realiser.English(structure).short()
+
+
+def _auto_ingest(data):
+    return lambda: grapher.GraphiteGraph().auto_ingest({'graphite_data': data})
+
+
+def _auto_ingest_batch(data):
+    return lambda: grapher.GraphiteGraph(batch=True).auto_ingest({'graphite_data': data})
+
+
+def _load_graphite(data):
+    raw = json.dumps(data).encode('utf-8')
+    return lambda: streaming.load_graphite(raw)
+
+
+def _small_raw(data):
+    return json.dumps([dict(series, datapoints=series['datapoints'][:SMALL_LENGTH])
+        for series in data]).encode('utf-8')
+
+
+def _load_graphite_small(data):
+    raw = _small_raw(data)
+    # A large chunk_size once made every value decode the rest of the chunk
+    return lambda: streaming.load_graphite(raw, 1 << 20)
+
+
+def _json_loads_small(data):
+    raw = _small_raw(data)
+    return lambda: [Series.from_graphite(series['datapoints'])
+            for series in json.loads(raw.decode('utf-8'))]
+
+
+def _cache_key(data):
+    cache = wordgraph.DescriptionCache()
+    return lambda: cache.key({'graphite_data': data}, 'graphite')
+
+
+def _describe(data):
+    return lambda: wordgraph.describe({'graphite_data': data}, source='graphite')
+
+
+# name: (setup, whether swept over the number of series)
+BENCHMARKS = dict(
+    [('analyser.' + analyser.__name__, (_analyser(analyser), False))
+        for analyser in analysers._analysers] + [
+    ('get_analysis', (_get_analysis, False)),
+    ('get_analysis[lttb]', (_get_analysis_reduced('lttb'), False)),
+    ('get_analysis[min-max]', (_get_analysis_reduced('min-max'), False)),
+    ('English.long', (_english_long, False)),
+    ('English.short', (_english_short, False)),
+    ('GraphiteGraph.auto_ingest', (_auto_ingest, True)),
+    ('GraphiteGraph.auto_ingest[batch]', (_auto_ingest_batch, True)),
+    ('streaming.load_graphite', (_load_graphite, True)),
+    ('streaming.load_graphite[small]', (_load_graphite_small, True)),
+    ('json.loads[small]', (_json_loads_small, True)),
+    ('DescriptionCache.key', (_cache_key, True)),
+    ('describe', (_describe, True)),
+])
+
+
+def measure(func, number=None, repeat=5):
+    '''
+    Return (number, seconds per call for each of repeat runs). number is
+    found by timeit's autorange if not given.
+    '''
+    timer = timeit.Timer(func)
+    if number is None:
+        number, elapsed = timer.autorange()
+    return number, [elapsed / number for elapsed in timer.repeat(repeat, number)]
+
+
+def environment():
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                stderr=subprocess.DEVNULL).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'commit': commit,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+    }
+
+
+def _cases(shapes, lengths, counts, count_length):
+    '''
+    Yield (shape, length, count, swept) for each graph to generate, where
+    swept says whether only the benchmarks swept over count apply.
+    '''
+    for shape in shapes:
+        # Single point series are the same whatever the length asked for
+        if shape == 'single-point':
+            shape_lengths, swept_length = [1], 1
+        else:
+            shape_lengths, swept_length = lengths, count_length
+        for length in shape_lengths:
+            yield shape, length, 1, False
+        for count in counts:
+            if count != 1:
+                yield shape, swept_length, count, True
+
+
+def run(benchmarks=None, shapes=None, lengths=LENGTHS, counts=COUNTS,
+        count_length=COUNT_LENGTH, number=None, repeat=5, progress=None):
+    '''
+    Run the named benchmarks (default all) over the synthetic shapes (default
+    all), returning a dict of the environment and a list of results. progress,
+    if given, is called with each result as it is measured.
+    '''
+    benchmarks = sorted(BENCHMARKS) if benchmarks is None else benchmarks
+    shapes = sorted(generators.SHAPES) if shapes is None else shapes
+    results = []
+    for shape, length, count, swept in _cases(shapes, lengths, counts, count_length):
+        data = generators.graphite_data(shape, length, count)
+        for name in benchmarks:
+            setup, over_count = BENCHMARKS[name]
+            if swept and not over_count:
+                continue
+            result = {'benchmark': name, 'shape': shape, 'length': length, 'count': count}
+            try:
+                calls, times = measure(setup(data), number, repeat)
+            except Exception as ex:
+                result['error'] = repr(ex)
+            else:
+                times.sort()
+                result.update(number=calls, repeat=repeat, best=times[0],
+                        median=times[len(times) // 2])
+            results.append(result)
+            if progress is not None:
+                progress(result)
+    return {'environment': environment(), 'results': results}
+
+
+def _key(result):
+    return result['benchmark'], result['shape'], result['length'], result['count']
+
+
+def compare(baseline, current, threshold=0.1):
+    '''
+    Compare the best times of two runs. Returns a list of (key, baseline
+    seconds, current seconds, ratio) for the measurements in both, and the
+    list of those slower than the baseline by more than threshold.
+    '''
+    before = dict((_key(result), result) for result in baseline['results']
+            if 'best' in result)
+    changes = []
+    for result in current['results']:
+        old = before.get(_key(result))
+        if old is not None and 'best' in result:
+            changes.append((_key(result), old['best'], result['best'],
+                result['best'] / old['best']))
+    regressions = [change for change in changes if change[3] > 1 + threshold]
+    return changes, regressions
+
+
+def _format(result):
+    text = '{benchmark:32} {shape:12} length={length:<8} count={count:<5}'.format(**result)
+    if 'error' in result:
+        return text + ' error: ' + result['error']
+    return text + ' best={0:.3g}s median={1:.3g}s'.format(result['best'], result['median'])
+
+
+def _integers(text):
+    return [int(item) for item in text.split(',')]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+            description='Benchmark the wordgraph describe pipeline.')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', metavar='BASELINE',
+            help='compare with the results in this JSON file, exiting with '
+                 'status 1 on a regression')
+    parser.add_argument('--threshold', type=float, default=0.1,
+            help='slowdown counted as a regression (default: 0.1, 10%%)')
+    parser.add_argument('--benchmark', action='append', choices=sorted(BENCHMARKS),
+            help='run only this benchmark (may be repeated)')
+    parser.add_argument('--shape', action='append', choices=sorted(generators.SHAPES),
+            help='use only this shape of series (may be repeated)')
+    parser.add_argument('--lengths', type=_integers, default=LENGTHS,
+            help='comma separated series lengths')
+    parser.add_argument('--counts', type=_integers, default=COUNTS,
+            help='comma separated numbers of series')
+    parser.add_argument('--count-length', type=int, default=COUNT_LENGTH,
+            help='length of each series when sweeping the number of series')
+    parser.add_argument('--quick', action='store_true',
+            help='sweep lengths {0} and counts {1} only'.format(QUICK_LENGTHS, QUICK_COUNTS))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--number', type=int, default=None,
+            help='calls per run (default: calibrated)')
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.lengths, args.counts = QUICK_LENGTHS, QUICK_COUNTS
+
+    report = lambda result: print(_format(result), file=sys.stderr)
+    results = run(args.benchmark, args.shape, args.lengths, args.counts,
+            args.count_length, args.number, args.repeat, progress=report)
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=1)
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        changes, regressions = compare(baseline, results, args.threshold)
+        for key, old, new, ratio in changes:
+            print('{0:32} {1:12} length={2:<8} count={3:<5}'.format(*key),
+                    '{0:.3g}s -> {1:.3g}s ({2:+.0%})'.format(old, new, ratio - 1),
+                    'REGRESSION' if ratio > 1 + args.threshold else '')
+        return 1 if regressions else 0
+    if not args.output:
+        json.dump(results, sys.stdout, indent=1)
+    return 0
@@ -15,9 +15,10 @@
 "Test of the Graphite JSON response object."
 import json
 import wordgraph
-from wordgraph import grapher
+from wordgraph import analysers, grapher
 
 import py
+import pytest
 
 from tests.lib import compare
 
@@ -47,3 +48,154 @@ def test_server_requests_graph_structure():
 
     compare.assertDictionary(structure, expected_data)
 
+
+def test_axis_extremes():
+    "Axis bounds cover every series, with missing values plotted at zero"
+    graph = grapher.GraphiteGraph()
+    graph.auto_ingest({'graphite_data': [
+        {'target': 'a', 'datapoints': [[1.0, 100], [None, 110], [3.0, 120]]},
+        {'target': 'b', 'datapoints': [[5.0, 90], [4.0, 100], [2.0, 110]]},
+    ]})
+    structure = graph.result_dict
+
+    assert structure['x_axis']['min'] == 90
+    assert structure['x_axis']['max'] == 120
+    assert structure['y_axis']['min'] == 0
+    assert structure['y_axis']['max'] == 5.0
+
+
+def test_integer_values_read_as_integers():
+    "Integral values are described as integers, as they were given"
+    graph = {'graphite_data': [{'target': 'requests', 'datapoints': [
+        [value, 1407123600 + 60 * index]
+            for index, value in enumerate([0, 1, 2, None, 4, 5, 6, 7])]}]}
+    text = wordgraph.describe(graph, source='graphite')
+    assert "The y axis, metric, ranges from 0 to 7." in text
+
+    raw = json.dumps(graph['graphite_data'])
+    assert wordgraph.describe(raw, source='graphite-json') == text
+
+    # Floats stay floats, even when integral
+    structure = grapher.GraphiteGraph()
+    structure.auto_ingest({'graphite_data': [
+        {'target': 'a', 'datapoints': [[1.5, 100], [2.0, 110]]},
+        {'target': 'b', 'datapoints': [[1, 100], [None, 110], [2, 120]]}]})
+    first, second = structure.result_dict['series']
+    assert repr(first['end_value']['y']) == '2.0'
+    assert [repr(second[key]['y']) for key in ('start_value', 'end_value')] == ['1', '2']
+    assert repr(second['min_y_value']) == '0'
+
+
+def test_missing_values_read_as_zero():
+    "Missing values, plotted at zero, read as 0 even among floats"
+    structure = grapher.GraphiteGraph()
+    structure.auto_ingest({'graphite_data': [
+        {'target': 'a', 'datapoints': [[1.5, 100], [2.5, 110], [None, 120]]}]})
+    series, = structure.result_dict['series']
+    assert repr(series['end_value']['y']) == '0'
+    assert repr(series['min_y_value']) == '0'
+    assert repr(structure.result_dict['y_axis']['min']) == '0'
+    assert repr(structure.result_dict['y_axis']['max']) == '2.5'
+
+
+def test_describe_ingested_graph_twice():
+    "Describing a graph leaves it unchanged, so it can be described again"
+    with open('tests/data/server_requests.json') as data:
+        graphite_data = json.load(data)
+    graph = grapher.GraphiteGraph()
+    graph.auto_ingest({'graphite_data': graphite_data})
+    expected = wordgraph.describe({'graphite_data': graphite_data}, source='graphite')
+    assert wordgraph.describe(graph) == expected
+    assert wordgraph.describe(graph) == expected
+
+
+def test_compact_matches_datapoints():
+    "The start/end/step form describes a graph the same as datapoints"
+    with open('tests/data/server_requests.json') as data:
+        graphite_data = json.load(data)
+    compact_data = []
+    for series in graphite_data:
+        timestamps = [timestamp for value, timestamp in series['datapoints']]
+        compact_data.append({
+            'name': series['target'],
+            'start': timestamps[0],
+            'end': timestamps[-1] + timestamps[1] - timestamps[0],
+            'step': timestamps[1] - timestamps[0],
+            'values': [value for value, timestamp in series['datapoints']],
+        })
+
+    expected = wordgraph.describe({'graphite_data': graphite_data}, source='graphite')
+    text = wordgraph.describe({'graphite_data': compact_data}, source='graphite-compact')
+    assert text == expected
+
+
+def test_compact_empty_series():
+    "A compact series with no values is still unprocessable"
+    graph = grapher.GraphiteCompactGraph()
+    graph.auto_ingest({'graphite_data': [
+        {'target': 'a', 'start': 100, 'end': 100, 'step': 10, 'values': []},
+    ]})
+    assert graph.result_dict['name'] == analysers.UNPROCESSABLE
+
+
+@pytest.mark.parametrize("end", [130, 150])
+def test_compact_length_mismatch(end):
+    "A compact series whose values do not fill start to end is rejected"
+    graph = grapher.GraphiteCompactGraph()
+    with pytest.raises(ValueError) as error:
+        graph.auto_ingest({'graphite_data': [
+            {'target': 'a', 'start': 100, 'end': end, 'step': 10,
+             'values': [1, 2, 3, 4]},
+        ]})
+    assert "'a' has 4 values" in str(error.value)
+
+
+def test_threads_match_serial():
+    "Series analysed on a thread pool are added in input order"
+    with open('tests/data/server_requests.json') as data:
+        graphite_data = json.load(data)
+    graphite_data = graphite_data * 5
+    expected = wordgraph.describe({'graphite_data': graphite_data}, source='graphite')
+
+    graph = grapher.GraphiteGraph(threads=3, keep_series=True)
+    graph.auto_ingest({'graphite_data': iter(graphite_data)})
+    assert [name for name, values in graph.iter_series()] == [
+        series['target'] for series in graphite_data]
+    assert wordgraph.describe({'graphite_data': graphite_data}, source='graphite',
+            threads=3) == expected
+
+
+def test_batch_matches_serial():
+    "Aligned series analysed in a batch describe the graph as one at a time"
+    with open('tests/data/server_requests.json') as data:
+        graphite_data = json.load(data)
+    # A series over other times is analysed on its own
+    graphite_data = graphite_data * 3 + [{'target': 'other', 'datapoints': [
+        [value, timestamp + 5] for value, timestamp in graphite_data[0]['datapoints']]}]
+    serial = grapher.GraphiteGraph()
+    serial.auto_ingest({'graphite_data': graphite_data})
+
+    graph = grapher.GraphiteGraph(batch=True)
+    graph.auto_ingest({'graphite_data': iter(graphite_data)})
+    expected = serial.as_dict()['series']
+    structure = graph.as_dict()['series']
+    assert [(item['name'], item['distribution']) for item in structure] == [
+        (item['name'], item['distribution']) for item in expected]
+    assert [item['fit'] for item in structure] == py.test.approx(
+        [item['fit'] for item in expected])
+    assert wordgraph.describe({'graphite_data': graphite_data}, source='graphite',
+            batch=True) == wordgraph.describe({'graphite_data': graphite_data},
+                    source='graphite')
+
+
+@py.test.mark.parametrize("options", [{}, {'threads': 2}, {'batch': True}])
+def test_unprocessable_series_stops_ingestion(options):
+    "A graph with an unprocessable series is described as unprocessable"
+    graph = grapher.GraphiteGraph(**options)
+    graph.auto_ingest({'graphite_data': [
+        {'target': 'a', 'datapoints': [[1.0, 100], [2.0, 110], [3.0, 200]]},
+        {'target': 'b', 'datapoints': [[1.0, 100], [2.0, 110], [3.0, 120]]},
+    ]})
+    structure = graph.as_dict()
+    assert structure['name'] == analysers.UNPROCESSABLE
+    assert 'not fixed width' in structure['result']
@@ -0,0 +1,109 @@
+# Copyright 2014 Tennessee Leeuwenburg
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"Tests of graphs which are updated as live data arrives."
+import math
+
+import pytest
+
+import wordgraph
+from wordgraph import grapher
+from tests.utilities import to_graphite_metric
+
+
+def bell(count):
+    return [50 * math.exp(-((i - count / 2.) / (count / 6.)) ** 2) for i in range(count)]
+
+
+def assert_same_description(found, expected):
+    assert found.keys() == expected.keys()
+    for key in ('title', 'x_axis', 'y_axis'):
+        assert found[key] == expected[key]
+    for found_series, expected_series in zip(found['series'], expected['series']):
+        assert found_series.pop('fit') == pytest.approx(expected_series.pop('fit'))
+        assert found_series == expected_series
+
+
+@pytest.mark.parametrize("values", [bell(120), [3.0 * i for i in range(50)],
+    [3 * i for i in range(50)]])
+def test_live_matches_full_ingest(values):
+    "Appending in chunks describes the same graph as ingesting it all at once"
+    metric = to_graphite_metric(values, name='requests')
+    datapoints = metric[0]['datapoints']
+
+    full = grapher.GraphiteGraph()
+    full.auto_ingest({'title': 'load', 'graphite_data': metric})
+
+    live = grapher.LiveGraphiteGraph()
+    live.auto_ingest({'title': 'load', 'graphite_data': [
+        {'target': 'requests', 'datapoints': datapoints[:7]}]})
+    for start in range(7, len(datapoints), 9):
+        live.append('requests', datapoints[start:start + 9])
+
+    assert_same_description(live.as_dict(), full.as_dict())
+
+
+def test_live_window():
+    "A windowed graph describes only its latest points"
+    values = bell(90) + bell(90)
+    datapoints = to_graphite_metric(values, name='requests')[0]['datapoints']
+    window = 70
+
+    live = grapher.LiveGraphiteGraph(window=window)
+    for start in range(0, len(datapoints), 4):
+        live.append('requests', datapoints[start:start + 4])
+        held = datapoints[max(0, start + 4 - window):start + 4]
+
+        full = grapher.GraphiteGraph()
+        full.auto_ingest({'graphite_data': [{'target': 'requests', 'datapoints': held}]})
+        assert_same_description(live.as_dict(), full.as_dict())
+
+
+def test_live_ignores_old_points():
+    live = grapher.LiveGraphiteGraph()
+    live.append('a', [[1.0, 100], [2.0, 110]])
+    live.append('a', [[5.0, 100], [7.0, 110], [3.0, 120]])
+    series = live.live_series['a'].context().series
+    assert series.x.tolist() == [100, 110, 120]
+    assert series.y.tolist() == [1.0, 2.0, 3.0]
+
+
+def test_describe_live_graph():
+    metric = to_graphite_metric([float(i) for i in range(10)], name='entries')
+    live = grapher.LiveGraphiteGraph()
+    live.auto_ingest({'graphite_data': metric})
+    first = wordgraph.describe(live)
+    assert first == wordgraph.describe({'graphite_data': metric}, source='graphite')
+
+    live.append('entries', [[100.0, metric[0]['datapoints'][-1][1] + 1]])
+    assert wordgraph.describe(live) != first
+
+
+def test_live_integral():
+    "A live series reads as integers until a float arrives"
+    metric = to_graphite_metric(list(range(7)), name='entries')
+    live = grapher.LiveGraphiteGraph()
+    live.auto_ingest({'graphite_data': metric})
+    assert "ranges from 0 to 6." in wordgraph.describe(live)
+
+    live.append('entries', [[7.5, metric[0]['datapoints'][-1][1] + 1]])
+    assert "ranges from 0 to 7.5." in wordgraph.describe(live)
+    live.append('entries', [[8, metric[0]['datapoints'][-1][1] + 2]])
+    assert "ranges from 0 to 8.0." in wordgraph.describe(live)
+
+
+def test_live_window_too_small():
+    live = grapher.LiveGraphiteGraph(window=0)
+    with pytest.raises(ValueError):
+        live.append('a', [[1.0, 100]])
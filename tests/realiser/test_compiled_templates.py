@@ -0,0 +1,72 @@
+# Copyright 2014 Tennessee Leeuwenburg
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import jinja2
+import pytest
+
+from wordgraph.realiser import __main__ as command, realiser
+
+graph = {
+    'title': 'load',
+    'x_axis': {'label': 'time', 'min': 'noon', 'max': 'one'},
+    'y_axis': {'label': 'requests', 'min': 0, 'max': 10},
+    'series': [{
+        'name': 'web01',
+        'distribution': 'linear',
+        'fit': 0.9,
+        'num_values': 2,
+        'start_value': {'x': 'noon', 'y': 0},
+        'end_value': {'x': 'one', 'y': 10}
+    }]
+}
+
+
+@pytest.fixture
+def environment(monkeypatch):
+    "Restore the realiser's environment after each test"
+    monkeypatch.setattr(realiser, 'env', realiser.env)
+
+
+def test_compiled_templates(environment, tmpdir, monkeypatch):
+    expected_long = realiser.English(graph).long()
+    expected_short = realiser.English(graph).short()
+
+    realiser.compile_templates(str(tmpdir))
+    realiser.use_compiled_templates(str(tmpdir))
+
+    def no_parsing(*args):
+        raise AssertionError("template source was loaded")
+    monkeypatch.setattr(jinja2.PackageLoader, 'get_source', no_parsing)
+
+    assert realiser.English(graph).long() == expected_long
+    assert realiser.English(graph).short() == expected_short
+
+
+def test_compile_command(tmpdir, capsys):
+    command.main([str(tmpdir)])
+    assert tmpdir.listdir()
+
+    with pytest.raises(SystemExit):
+        command.main([])
+    assert 'usage: python -m wordgraph.realiser' in capsys.readouterr().err
+
+
+def test_bytecode_cache(environment, tmpdir):
+    expected = realiser.English(graph).long()
+    realiser.env = realiser._create_environment(realiser._package_loader())
+    realiser.use_bytecode_cache(str(tmpdir))
+    realiser.preload()
+
+    assert tmpdir.listdir()
+    assert realiser.English(graph).long() == expected
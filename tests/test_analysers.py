@@ -0,0 +1,123 @@
+# Copyright 2014 Tennessee Leeuwenburg
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+
+from wordgraph import analysers
+from wordgraph.points import Point
+
+
+def test_series_context_statistics():
+    "The shared context sorts once and holds the common statistics"
+    points = [Point(2, 5), Point(0, 1), Point(1, 3)]
+    context = analysers.SeriesContext.from_points(points)
+    assert context.series.x.tolist() == [0, 1, 2]
+    assert context.n == 3
+    assert (context.min_x, context.max_x) == (0, 2)
+    assert (context.min_y, context.max_y) == (1, 5)
+    assert context.first == Point(0, 1)
+    assert context.last == Point(2, 5)
+    assert analysers.SeriesContext.from_points(context) is context
+    with pytest.raises(ValueError):
+        context.series.y[0] = 10
+
+
+def test_analysers_share_context():
+    context = analysers.SeriesContext.from_points(
+            [Point(i, i) for i in range(5)])
+    for analyser in analysers._analysers:
+        assert analyser(context).points is context.series
+
+
+def test_evaluation_is_memoised(monkeypatch):
+    "Validity and result are computed once, however often they are asked for"
+    calls = []
+    original = analysers.NormalDistribution.get_validity
+
+    def counting_validity(self):
+        calls.append(self)
+        return original(self)
+
+    monkeypatch.setattr(analysers.NormalDistribution, 'get_validity',
+            counting_validity)
+    points = [Point(i, 10 - abs(5 - i)) for i in range(11)]
+    analysis = analysers.get_analysis(points)
+
+    assert analysis['name'] == 'normal'
+    assert len(calls) == 1
+
+    analyser = calls[0]
+    evaluation = analyser.evaluate()
+    str(analyser)
+    assert len(calls) == 1
+    assert evaluation.validity == analysis['p_value']
+    assert evaluation.result == analysis['result']
+
+
+@pytest.mark.parametrize("x_values", [
+        [0, 1, 2, 3, 4],
+        [4, 3, 2, 1, 0],
+        [0.0, 1.005, 2.0, 3.0]])
+def test_fixed_interval(x_values):
+    analysers.assert_fixed_interval([Point(x, 1) for x in x_values])
+
+
+@pytest.mark.parametrize(["x_values", "index"], [
+        ([0, 1, 2, 2.5, 4, 5], 3),
+        ([5, 4, 3, 2.5, 1, 0], 2),
+        ([0, 2, 3, 4, 6, 7, 9, 10], 1),
+        ([3, 3, 3], 1)])
+def test_uneven_interval(x_values, index):
+    "The error reports the first point after the uneven gap"
+    with pytest.raises(analysers.IntervalError) as info:
+        analysers.assert_fixed_interval([Point(x, 1) for x in x_values])
+    assert info.value.index == index
+    assert "not fixed width" in str(info.value)
+
+
+def test_no_points():
+    with pytest.raises(ValueError):
+        analysers.assert_fixed_interval([])
+
+
+def test_aligned_analyses_match_get_analysis():
+    "Analysing aligned series together picks the same analysers and results"
+    import numpy as np
+    from wordgraph.points import Series
+
+    rng = np.random.RandomState(0)
+    x_values = 1407123600 + 60 * np.arange(200, dtype='float64')
+    position = np.arange(200)
+    y_values = np.stack([
+        3 * position + rng.normal(0, 0.1, 200),
+        np.exp(-(position - 90) ** 2 / 800.) + rng.normal(0, 0.01, 200),
+        rng.uniform(0, 10, 200),
+        np.full(200, 7.0),
+    ])
+
+    aligned = analysers.get_aligned_analyses(x_values, y_values)
+
+    for y, analysis in zip(y_values, aligned):
+        expected = analysers.get_analysis(Series(x_values, y))
+        assert analysis['name'] == expected['name']
+        assert analysis['min_y_value'] == expected['min_y_value']
+        assert analysis['p_value'] == pytest.approx(expected['p_value'])
+        assert analysis['result'] == pytest.approx(expected['result'])
+    assert [aligned[row]['name'] for row in (0, 1, 3)] == ['linear', 'normal', 'linear']
+
+
+def test_aligned_analyses_uneven_interval():
+    aligned = analysers.get_aligned_analyses([0, 1, 3], [[1, 2, 3], [3, 2, 1]])
+    assert [analysis['name'] for analysis in aligned] == [analysers.UNPROCESSABLE] * 2
+    assert "not fixed width" in aligned[0]['result']
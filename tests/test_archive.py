@@ -0,0 +1,120 @@
+# Copyright 2014 Tennessee Leeuwenburg
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"Tests of saving series to, and describing them from, archive files."
+import json
+
+import pytest
+
+import wordgraph
+from wordgraph import archive, grapher
+
+SERVER_REQUESTS = 'tests/data/server_requests.json'
+
+
+def graphite_data():
+    with open(SERVER_REQUESTS) as data:
+        return json.load(data)
+
+
+def test_convert_and_load(tmpdir):
+    "Converted series are memory-mapped views with the original values"
+    path = str(tmpdir.join('requests.wga'))
+    with open(SERVER_REQUESTS, 'rb') as source:
+        archive.convert(source, path, title='server requests')
+    data = archive.load(path)
+
+    assert data['title'] == 'server requests'
+    expected = graphite_data()
+    assert [s['target'] for s in data['graphite_data']] == [s['target'] for s in expected]
+    for series, reference in zip(data['graphite_data'], expected):
+        values = series['datapoints']
+        assert values.x.tolist() == [p[1] for p in reference['datapoints']]
+        assert values.y.tolist() == [p[0] or 0 for p in reference['datapoints']]
+        assert not values.x.flags.owndata
+        assert not values.y.flags.writeable
+
+
+def test_describe_archive(tmpdir):
+    "An archive describes the same as the JSON it came from"
+    path = str(tmpdir.join('requests.wga'))
+    with open(SERVER_REQUESTS, 'rb') as source:
+        archive.convert(source, path)
+    expected = wordgraph.describe({'title': 'requests', 'graphite_data': graphite_data()},
+            source='graphite')
+
+    assert wordgraph.describe({'path': path, 'title': 'requests'}, source='archive') == expected
+    assert wordgraph.describe(dict(archive.load(path), title='requests'),
+            source='graphite') == expected
+
+
+def test_integers_round_trip(tmpdir):
+    "Series given as integers are still described as integers from an archive"
+    graph = {'graphite_data': [{'target': 'requests', 'datapoints': [
+        [value, 1407123600 + 60 * index]
+            for index, value in enumerate([0, 1, 2, None, 4, 5, 6])]}]}
+    expected = wordgraph.describe(graph, source='graphite')
+    assert "ranges from 0 to 6." in expected
+
+    converted = str(tmpdir.join('converted.wga'))
+    archive.convert(json.dumps(graph['graphite_data']), converted)
+    structure = grapher.GraphiteGraph(keep_series=True)
+    structure.auto_ingest(graph)
+    written = str(tmpdir.join('written.wga'))
+    archive.write(written, structure)
+    for path in (converted, written):
+        assert wordgraph.describe({'path': path}, source='archive') == expected
+
+
+@pytest.mark.parametrize("graph_type", [
+    lambda: grapher.GraphiteGraph(keep_series=True),
+    grapher.LiveGraphiteGraph,
+])
+def test_write_ingested_graph(tmpdir, graph_type):
+    "Any ingested graphite graph can be saved, metadata included"
+    graph = graph_type()
+    graph.auto_ingest({'title': 'requests', 'y_axis': {'label': 'per second'},
+            'graphite_data': graphite_data()})
+    path = str(tmpdir.join('requests.wga'))
+    archive.write(path, graph)
+    data = archive.load(path)
+
+    assert data['title'] == 'requests'
+    assert data['y_axis'] == {'label': 'per second'}
+    for (target, values), series in zip(graph.iter_series(), data['graphite_data']):
+        assert series['target'] == target
+        assert series['datapoints'].y.tolist() == values.y.tolist()
+
+
+def test_series_not_kept(tmpdir):
+    "A graph only keeps its series for writing when asked to"
+    graph = grapher.GraphiteGraph()
+    graph.auto_ingest({'graphite_data': graphite_data()})
+    assert graph.series_values == []
+    with pytest.raises(ValueError):
+        archive.write(str(tmpdir.join('requests.wga')), graph)
+
+
+def test_empty_archive(tmpdir):
+    path = str(tmpdir.join('empty.wga'))
+    archive.convert(b'[]', path)
+    assert archive.load(path) == {'graphite_data': []}
+
+
+@pytest.mark.parametrize("content", [b'', b'WRDGRAPH', b'x' * 64])
+def test_not_an_archive(tmpdir, content):
+    path = tmpdir.join('bad.wga')
+    path.write_binary(content)
+    with pytest.raises(ValueError):
+        archive.load(str(path))
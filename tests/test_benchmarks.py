@@ -0,0 +1,53 @@
+# Copyright 2014 Tennessee Leeuwenburg
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"Smoke test of the benchmark suite, at tiny sizes."
+import json
+
+from benchmarks import generators, suite
+
+
+def test_generators():
+    for shape in generators.SHAPES:
+        data = generators.graphite_data(shape, 10, count=3)
+        assert [series['target'] for series in data] == [
+            '{0}.{1}'.format(shape, number) for number in range(3)]
+        expected = 1 if shape == 'single-point' else 10
+        assert all(len(series['datapoints']) == expected for series in data)
+
+
+def test_run_every_benchmark():
+    results = suite.run(lengths=[10], counts=[1, 2], number=1, repeat=1)['results']
+
+    assert not [result for result in results if 'error' in result]
+    for name, (setup, over_count) in suite.BENCHMARKS.items():
+        counts = set(result['count'] for result in results if result['benchmark'] == name)
+        assert counts == ({1, 2} if over_count else {1})
+
+
+def test_main_output_and_compare(tmpdir):
+    output = str(tmpdir.join('results.json'))
+    options = ['--benchmark', 'describe', '--shape', 'linear', '--lengths', '10',
+            '--counts', '1', '--number', '1', '--repeat', '1']
+    assert suite.main(options + ['--output', output]) == 0
+    with open(output) as results_file:
+        baseline = json.load(results_file)
+    assert baseline['environment']['python']
+    assert len(baseline['results']) == 1
+
+    # Make the baseline impossibly fast, so the new run is a regression
+    baseline['results'][0]['best'] = 1e-12
+    with open(output, 'w') as results_file:
+        json.dump(baseline, results_file)
+    assert suite.main(options + ['--compare', output]) == 1
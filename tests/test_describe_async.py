@@ -0,0 +1,106 @@
+# Copyright 2014 Tennessee Leeuwenburg
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"Tests of the asyncio interface."
+import asyncio
+import threading
+import time
+from concurrent import futures
+
+import pytest
+
+import wordgraph
+from wordgraph import describer
+from .utilities import to_graphite_metric
+
+
+def graph(length=5):
+    return {'graphite_data': to_graphite_metric([float(i) for i in range(length)])}
+
+
+def test_describe_async():
+    expected = wordgraph.describe(graph(), source='graphite')
+    text = asyncio.run(wordgraph.describe_async(graph(), source='graphite'))
+    assert text == expected
+
+
+def test_describer_process_pool():
+    expected = wordgraph.describe(graph(), source='graphite')
+
+    async def run():
+        with futures.ProcessPoolExecutor(max_workers=1) as pool:
+            english = wordgraph.Describer(source='graphite', executor=pool)
+            return await english.description_async(graph())
+
+    assert asyncio.run(run()) == expected
+
+
+def test_bounded_concurrency(monkeypatch):
+    "No more than max_concurrency descriptions are analysed at once"
+    lock = threading.Lock()
+    running = [0]
+    most_running = [0]
+    ingest = describer._ingest
+
+    def slow_ingest(data, source, **graph_options):
+        with lock:
+            running[0] += 1
+            most_running[0] = max(most_running[0], running[0])
+        time.sleep(.02)
+        with lock:
+            running[0] -= 1
+        return ingest(data, source, **graph_options)
+
+    monkeypatch.setattr(describer, '_ingest', slow_ingest)
+
+    async def run():
+        with futures.ThreadPoolExecutor(max_workers=8) as pool:
+            english = wordgraph.Describer(source='graphite', executor=pool,
+                    max_concurrency=2)
+            return await asyncio.gather(
+                    *[english.description_async(graph()) for i in range(6)])
+
+    texts = asyncio.run(run())
+    assert len(set(texts)) == 1
+    assert most_running[0] == 2
+
+
+def test_cancellation(monkeypatch):
+    "A cancelled description never reaches the realiser"
+    started = threading.Event()
+    release = threading.Event()
+    realised = []
+    ingest = describer._ingest
+
+    def blocking_ingest(data, source, **graph_options):
+        started.set()
+        release.wait(5)
+        return ingest(data, source, **graph_options)
+
+    monkeypatch.setattr(describer, '_ingest', blocking_ingest)
+    monkeypatch.setattr(describer, '_realise', realised.append)
+
+    async def run():
+        with futures.ThreadPoolExecutor(max_workers=1) as pool:
+            task = asyncio.ensure_future(
+                    wordgraph.describe_async(graph(), source='graphite', executor=pool))
+            while not started.is_set():
+                await asyncio.sleep(.001)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            release.set()
+
+    asyncio.run(run())
+    assert realised == []
@@ -0,0 +1,65 @@
+# Copyright 2014 Tennessee Leeuwenburg
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"Tests of describing many graphs in one call."
+import pytest
+
+import wordgraph
+from .utilities import to_graphite_metric
+
+
+def graphs():
+    for length in range(1, 8):
+        values = [float(i * i) for i in range(length)]
+        yield {'graphite_data': to_graphite_metric(values, name='s%d' % length)}
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_describe_many_in_order(workers):
+    expected = [wordgraph.describe(graph, source='graphite') for graph in graphs()]
+    descriptions = list(wordgraph.describe_many(graphs(), source='graphite',
+            workers=workers, chunksize=2))
+
+    assert [d.index for d in descriptions] == list(range(len(expected)))
+    assert [d.text for d in descriptions] == expected
+    assert all(d.error is None for d in descriptions)
+
+
+def test_describe_many_as_completed():
+    expected = [wordgraph.describe(graph, source='graphite') for graph in graphs()]
+    descriptions = wordgraph.describe_many(graphs(), source='graphite',
+            workers=2, chunksize=1, ordered=False)
+
+    found = dict((d.index, d.text) for d in descriptions)
+    assert found == dict(enumerate(expected))
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_describe_many_isolates_failures(workers):
+    "A broken graph is reported, and the graphs around it are still described"
+    data = list(graphs())
+    data.insert(2, {'not graphite': []})
+    descriptions = list(wordgraph.describe_many(data, source='graphite',
+            workers=workers, chunksize=3))
+
+    assert len(descriptions) == len(data)
+    assert descriptions[2].text is None
+    assert isinstance(descriptions[2].error, KeyError)
+    assert all(d.text for d in descriptions if d.index != 2)
+
+
+def test_describer_descriptions():
+    describer = wordgraph.Describer(source='graphite')
+    descriptions = list(describer.descriptions(graphs(), workers=1))
+    assert descriptions[0].text == describer.description(next(graphs()))
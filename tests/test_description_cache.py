@@ -0,0 +1,129 @@
+# Copyright 2014 Tennessee Leeuwenburg
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"Tests of the description cache."
+import asyncio
+import copy
+
+import numpy as np
+
+import wordgraph
+from wordgraph import describer, grapher
+from wordgraph.points import Series
+from .utilities import to_graphite_metric
+
+
+def graph(length=5, name='entries'):
+    values = [float(i) for i in range(length)]
+    return {'graphite_data': to_graphite_metric(values, name=name)}
+
+
+class Clock(object):
+    now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_repeat_requests_hit(monkeypatch):
+    cache = wordgraph.DescriptionCache()
+    first = wordgraph.describe(graph(), source='graphite', cache=cache)
+    assert (cache.hits, cache.misses) == (0, 1)
+
+    monkeypatch.setattr(describer, '_ingest', None)
+    second = wordgraph.describe(copy.deepcopy(graph()), source='graphite', cache=cache)
+    assert second == first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_key_covers_data_and_options():
+    cache = wordgraph.DescriptionCache()
+    key = cache.key(graph(), 'graphite', 'English', 'summary')
+    assert key == cache.key(graph(), 'graphite', 'English', 'summary')
+    assert key != cache.key(graph(6), 'graphite', 'English', 'summary')
+    assert key != cache.key(graph(), 'graphite', 'es', 'summary')
+    assert key != cache.key(graph(), 'graphite', 'English', 'expert')
+
+
+def test_array_fingerprints():
+    cache = wordgraph.DescriptionCache()
+    series = Series(np.arange(10), np.arange(10) * 2)
+    same = Series(np.arange(10), np.arange(10) * 2)
+    other = Series(np.arange(10), np.arange(10) * 3)
+    assert cache.key(series) == cache.key(same)
+    assert cache.key(series) != cache.key(other)
+    assert cache.key(b'abc') != cache.key(b'abd')
+    assert cache.key(grapher.LiveGraphiteGraph()) is None
+
+
+def test_datapoints_fingerprints():
+    cache = wordgraph.DescriptionCache()
+    key = cache.key(graph(), 'graphite')
+    missing = graph()
+    missing['graphite_data'][0]['datapoints'][1][0] = None
+    ragged = {'graphite_data': [{'target': 'a', 'datapoints': [[1, 2, 3], [4]]}]}
+    pairs = {'graphite_data': [{'target': 'a', 'datapoints': [[1, 2], [3, 4]]}]}
+    assert cache.key(missing, 'graphite') not in (None, key)
+    assert cache.key(ragged, 'graphite') != cache.key(pairs, 'graphite')
+
+
+def test_lru_eviction():
+    cache = wordgraph.DescriptionCache(maxsize=2)
+    cache.put('a', 'A')
+    cache.put('b', 'B')
+    cache.get('a')
+    cache.put('c', 'C')
+    assert cache.get('b') is None
+    assert cache.get('a') == 'A'
+    assert cache.get('c') == 'C'
+    assert len(cache) == 2
+
+
+def test_size_limit():
+    cache = wordgraph.DescriptionCache(max_bytes=10)
+    cache.put('a', 'x' * 6)
+    cache.put('b', 'y' * 6)
+    assert cache.get('a') is None
+    assert cache.get('b') == 'y' * 6
+
+
+def test_ttl():
+    clock = Clock()
+    cache = wordgraph.DescriptionCache(ttl=10, clock=clock)
+    cache.put('a', 'A')
+    clock.now = 9
+    assert cache.get('a') == 'A'
+    clock.now = 11
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+
+def test_describer_and_async_share_cache():
+    cache = wordgraph.DescriptionCache()
+    english = wordgraph.Describer(source='graphite', cache=cache)
+    text = english.description(graph())
+    assert asyncio.run(english.description_async(graph())) == text
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_describe_many_uses_cache():
+    cache = wordgraph.DescriptionCache()
+    wordgraph.describe(graph(3), source='graphite', cache=cache)
+    data = [graph(length) for length in (2, 3, 4, 2)]
+    descriptions = list(wordgraph.describe_many(data, source='graphite',
+            cache=cache, workers=2, chunksize=1))
+
+    expected = [wordgraph.describe(item, source='graphite') for item in data]
+    assert [d.text for d in descriptions] == expected
+    assert len(cache) == 3
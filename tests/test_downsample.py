@@ -0,0 +1,118 @@
+# Copyright 2014 Tennessee Leeuwenburg
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+
+import wordgraph
+from wordgraph import analysers, downsample, grapher
+from wordgraph.points import Series
+from .utilities import to_graphite_metric
+
+
+def noisy_bell(count=5000):
+    x_values = np.arange(count, dtype=float) * 10 + 1407109280
+    rng = np.random.RandomState(0)
+    y_values = (100 * np.exp(-((np.arange(count) - count / 2.) / (count / 8.)) ** 2)
+            + rng.normal(0, 3, count))
+    return Series(x_values, y_values)
+
+
+@pytest.mark.parametrize("method", sorted(downsample.METHODS))
+def test_keeps_extremes(method):
+    series = noisy_bell()
+    reduced = downsample.reduce(series, 200, method)
+
+    assert len(reduced) <= 202
+    assert reduced.is_sorted()
+    assert reduced[0] == series[0]
+    assert reduced[-1] == series[-1]
+    assert reduced.y.min() == series.y.min()
+    assert reduced.y.max() == series.y.max()
+    assert set(reduced.x.tolist()) <= set(series.x.tolist())
+
+
+@pytest.mark.parametrize("method", sorted(downsample.METHODS))
+def test_short_series_unchanged(method):
+    series = noisy_bell(50)
+    assert downsample.reduce(series, 200, method) is series
+    assert downsample.METHODS[method](series, 200) is series
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        downsample.reduce(noisy_bell(), 100, 'every-other')
+
+
+def test_lttb_keeps_spike():
+    "A single spike in a flat series survives decimation"
+    y_values = np.zeros(1000)
+    y_values[437] = 50
+    series = Series(np.arange(1000), y_values)
+    reduced = downsample.lttb(series, 20)
+    assert 437 in reduced.x.tolist()
+
+
+@pytest.mark.parametrize("method", sorted(downsample.METHODS))
+def test_downsampled_analysis(method):
+    "A reduced series is described the same way as the full one"
+    series = noisy_bell()
+    full = analysers.get_analysis(series)
+    reduced = analysers.get_analysis(series, max_points=500, downsample=method)
+    assert reduced['name'] == full['name'] == 'normal'
+    assert reduced['min_y_value'] == full['min_y_value']
+    assert reduced['p_value'] == pytest.approx(full['p_value'], abs=.005)
+    stdev = full['result']['stdev']
+    assert reduced['result']['mean'] == pytest.approx(full['result']['mean'],
+            abs=stdev * .01)
+    assert reduced['result']['stdev'] == pytest.approx(stdev, rel=.01)
+
+
+def test_downsampled_linear_fit():
+    "The gradient of a reduced series is that of the full series"
+    x_values = np.arange(20000, dtype=float)
+    rng = np.random.RandomState(0)
+    series = Series(x_values, 3 * x_values + rng.normal(0, 500, 20000))
+    context = analysers.SeriesContext.from_points(series)
+    full = analysers.LinearDistribution(context).evaluate()
+    reduced = analysers.LinearDistribution(
+            analysers._reduced_context(context, 200, 'lttb')).evaluate()
+    assert reduced.result['gradient'] == pytest.approx(3, rel=.01)
+    assert reduced.result == pytest.approx(full.result)
+    assert reduced.validity == pytest.approx(full.validity)
+
+
+def test_downsampled_interval_check():
+    "Uneven input is rejected before it is reduced"
+    x_values = np.arange(1000, dtype=float)
+    x_values[500:] += 5
+    result = analysers.get_analysis(Series(x_values, np.ones(1000)), max_points=100)
+    assert result['name'] == analysers.UNPROCESSABLE
+
+
+def test_describer_max_points():
+    values = noisy_bell(2000).y.tolist()
+    graph = {'graphite_data': to_graphite_metric(values, name='load')}
+
+    structure = grapher.GraphiteGraph(max_points=100)
+    structure.auto_ingest(graph)
+    series = structure.result_dict['series'][0]
+    assert series['num_values'] == 2000
+    assert series['start_value']['y'] == values[0]
+    assert series['end_value']['y'] == values[-1]
+    assert structure.result_dict['y_axis']['max'] == max(values)
+
+    text = wordgraph.Describer(source='graphite', max_points=100,
+            downsample='min-max').description(graph)
+    assert text == wordgraph.describe(graph, source='graphite')
@@ -0,0 +1,141 @@
+# Copyright 2014 Tennessee Leeuwenburg
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"Tests of fetching series from a stand-in graphite render API."
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+import wordgraph
+from wordgraph import fetch
+
+with open('tests/data/server_requests.json') as data:
+    SERIES = dict((series['target'], series) for series in json.load(data))
+
+
+class RenderHandler(BaseHTTPRequestHandler):
+    '''
+    Serves the test series, recording each request and the client port it
+    arrived from. maxDataPoints is honoured by keeping the latest points.
+    '''
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        self.server.requests.append((self.client_address[1], url.path, query))
+        if url.path != '/graphite/render':
+            body = b'Not found'
+            self.send_response(404)
+        else:
+            limit = int(query.get('maxDataPoints', ['0'])[0]) or None
+            result = []
+            for target in query['target']:
+                name = target.split('(')[-1].split(',')[0]
+                for key in sorted(SERIES):
+                    if key.startswith(name.rstrip('*')):
+                        points = SERIES[key]['datapoints']
+                        result.append({'target': key,
+                            'datapoints': points[-limit:] if limit else points})
+            body = json.dumps(result).encode('utf-8')
+            self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        # Close the connection without saying so, as an idle timeout would
+        self.close_connection = self.server.drop_connections
+
+
+@pytest.fixture
+def graphite():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), RenderHandler)
+    server.daemon_threads = True
+    server.requests = []
+    server.drop_connections = False
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,))
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def client(server, **options):
+    return fetch.GraphiteClient('http://{0}:{1}/graphite/'.format(*server.server_address),
+            **options)
+
+
+def test_graph_describes_like_fetched_data(graphite):
+    with client(graphite) as graphite_client:
+        graph = graphite_client.graph(['web_server_01', 'web_server_02'], title='requests')
+    expected = wordgraph.describe({'title': 'requests', 'graphite_data': [
+        SERIES['web_server_01'], SERIES['web_server_02']]}, source='graphite')
+
+    assert wordgraph.describe(graph) == expected
+
+
+def test_pushdown(graphite):
+    "maxDataPoints and consolidateBy are passed on to graphite"
+    with client(graphite) as graphite_client:
+        graph = graphite_client.graph(['web_server_0*'], from_time='-15min',
+                max_points=30, consolidate_by='max')
+    port, path, query = graphite.requests[0]
+
+    assert query['target'] == ["consolidateBy(web_server_0*,'max')"]
+    assert query['maxDataPoints'] == ['30']
+    assert query['from'] == ['-15min']
+    assert query['format'] == ['json']
+    structure = graph.as_dict()
+    assert len(structure['series']) == 4
+    assert all(series['num_values'] == 30 for series in structure['series'])
+
+
+def test_concurrent_fetches_reuse_connections(graphite):
+    "Targets come back in order, over no more connections than the pool size"
+    targets = sorted(SERIES) * 3
+    with client(graphite, pool_size=2) as graphite_client:
+        series = graphite_client.fetch(targets)
+        series += graphite_client.fetch(targets)
+
+    assert [s['target'] for s in series] == targets * 2
+    assert len(graphite.requests) == 2 * len(targets)
+    assert len(set(port for port, path, query in graphite.requests)) <= 2
+
+
+def test_stale_connection_retried(graphite):
+    graphite.drop_connections = True
+    with client(graphite, pool_size=1) as graphite_client:
+        for attempt in range(3):
+            assert len(graphite_client.render(['web_server_01'])) == 1
+
+
+def test_errors(graphite):
+    with pytest.raises(fetch.FetchError) as info:
+        fetch.GraphiteClient('http://{0}:{1}/'.format(*graphite.server_address)).render(['a'])
+    assert info.value.status == 404
+
+    with pytest.raises(ValueError):
+        client(graphite).render(['a'], consolidate_by='mean')
+
+    graphite.shutdown()
+    graphite.server_close()
+    with pytest.raises(fetch.FetchError):
+        client(graphite, timeout=1).render(['a'])
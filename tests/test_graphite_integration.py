@@ -101,7 +101,14 @@ def test_server_requests():
 
         graph = {'graphite_data': json.load(data)}
         full_long = wordgraph.describe(graph, source='graphite')
-        assert full_long is not None
+        expected = """
+        This graph shows the relationship between time and metric
+        The x axis, time, ranges from 04 Aug 2014 02:05:10 to 04 Aug 2014 02:20:00
+        The y axis, metric, ranges from 0 to 37.300000000000004
+        It contains 4 series
+        """
+
+        assertParagraph(full_long, expected)
 
 def test_memory_usage():
     """Response data from Graphite server of fictional memory usage.
@@ -0,0 +1,56 @@
+# Copyright 2014 Tennessee Leeuwenburg
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"Regression tests for the cost of importing wordgraph."
+import json
+import subprocess
+import sys
+
+HEAVY_PACKAGES = ('numpy', 'jinja2', 'markupsafe', 'num2words', 'asyncio', 'concurrent')
+
+PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+import wordgraph
+elapsed = time.perf_counter() - start
+heavy = sorted(name for name in sys.modules if name.split('.')[0] in %r)
+%s
+print(json.dumps({'elapsed': elapsed, 'heavy': heavy}))
+'''
+
+
+def probe(after_import=''):
+    output = subprocess.check_output(
+            [sys.executable, '-c', PROBE % (HEAVY_PACKAGES, after_import)])
+    return json.loads(output.decode('utf-8').splitlines()[-1])
+
+
+def test_bare_import_is_light():
+    "A bare import loads none of the heavy dependencies, and is quick"
+    result = probe()
+    assert result['heavy'] == []
+    # Generous, to allow for slow machines; eager imports took several times this
+    assert result['elapsed'] < 0.5
+
+
+def test_describe_still_works_after_lazy_import():
+    result = probe(after_import='''
+text = wordgraph.describe({'graphite_data': [{'target': 'entries',
+    'datapoints': [[1.0, 1311836008], [2.0, 1311836009], [3.0, 1311836010]]}]},
+    source='graphite')
+assert text.startswith('This graph shows')
+heavy = sorted(name for name in sys.modules if name.split('.')[0] in ('numpy', 'jinja2'))
+''')
+    assert 'numpy' in result['heavy']
+    assert 'jinja2' in result['heavy']
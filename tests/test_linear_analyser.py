@@ -54,3 +54,32 @@ def test_fuzz():
     validities = [analysers.LinearDistribution(points=points).get_validity()
             for points in generate_fuzzy_points()]
     assert validities == sorted(validities, reverse=True)
+
+
+def test_running_fit_matches_polyfit():
+    "Adding points one at a time or in batches gives the ordinary least squares fit"
+    import numpy as np
+    x_values = np.arange(50, dtype=float)
+    y_values = 3 * x_values - 7 + np.sin(x_values)
+
+    one_at_a_time = analysers.RunningLinearFit()
+    for x, y in zip(x_values, y_values):
+        one_at_a_time.add(x, y)
+    batched = analysers.RunningLinearFit()
+    batched.update(x_values[:20], y_values[:20])
+    batched.update(x_values[20:], y_values[20:])
+
+    gradient, constant = np.polyfit(x_values, y_values, 1)
+    residuals = np.var(gradient * x_values + constant - y_values)
+    for fit in (one_at_a_time, batched):
+        assert fit.gradient == pytest.approx(gradient)
+        assert fit.constant == pytest.approx(constant)
+        assert fit.residual_variance == pytest.approx(residuals)
+
+
+def test_timestamp_conditioning():
+    "A perfect line on unix timestamps is still recognised as perfect"
+    points = [Point(1311836008 + 10 * i, 5 * i + 2.5) for i in range(100)]
+    ld = analysers.LinearDistribution(points=points)
+    assert ld.get_validity() == pytest.approx(1.0)
+    assert ld.gradient == pytest.approx(0.5)
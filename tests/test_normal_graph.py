@@ -75,3 +75,26 @@ def test_normal(mean, stddev, offset):
     points = [Point(x, y) for x, y in zip(x_values, y_values)]
     analyser = analysers.get_analysis(points=points)
     assert analyser['name'] == 'normal'
+
+
+def test_vectorised_erf():
+    x_values = [-4, -1.5, -0.3, 0, 0.2, 1, 2.5, 6]
+    expected = [math.erf(x) for x in x_values]
+    assert analysers.erf(x_values) == pytest.approx(expected, abs=2e-7)
+
+
+def test_cumulative_area_rows():
+    "A 2D array of y values gives one running area per row"
+    x_values = [0, 1, 2, 3]
+    rows = [[10, 10, 10, 10], [10, 15, 15, 10], [10, 20, 15, 10]]
+    areas = analysers.cumulative_area(x_values, rows, [[10], [10], [10]])
+    assert areas[:, -1].tolist() == [0, 10, 15]
+    for row, area in zip(rows, areas):
+        single = analysers.cumulative_area(x_values, row, min(row))
+        assert single.tolist() == area.tolist()
+
+
+def test_single_point_quantile():
+    nd = analysers.NormalDistribution(points=[Point(0, 5)])
+    assert nd.x_value_at(.5) is None
+    assert nd.get_validity() == 0
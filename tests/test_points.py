@@ -0,0 +1,103 @@
+# Copyright 2014 Tennessee Leeuwenburg
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+
+from wordgraph import analysers
+from wordgraph.points import Point, Series, as_series
+
+
+def test_series_point_view():
+    "Indexing and iterating a series produces Point objects"
+    series = Series([1, 2, 3], [10, 20, 30])
+    assert series[0] == Point(1.0, 10.0)
+    assert series[-1] == Point(3.0, 30.0)
+    assert list(series) == [Point(1.0, 10.0), Point(2.0, 20.0), Point(3.0, 30.0)]
+    assert len(series) == 3
+    assert series.x.dtype == np.float64
+
+
+def test_series_float32():
+    series = Series([1, 2], [0.5, 1.5], dtype='float32')
+    assert series.dtype == np.float32
+    assert series.y.flags['C_CONTIGUOUS']
+
+
+def test_series_mismatched_lengths():
+    with pytest.raises(ValueError):
+        Series([1, 2, 3], [1, 2])
+
+
+def test_series_sorted():
+    series = Series([3, 1, 2, 1], [30, 10, 20, 11])
+    ordered = series.sorted()
+    assert ordered.x.tolist() == [1, 1, 2, 3]
+    assert ordered.y.tolist() == [10, 11, 20, 30]
+    assert ordered.sorted() is ordered
+
+
+def test_as_series_from_points():
+    points = [Point(i, 2 * i) for i in range(5)]
+    series = as_series(points)
+    assert series.points() == points
+    assert as_series(series) is series
+
+
+def test_analysis_accepts_series():
+    "The analysers give the same answer for a Series and a list of Points"
+    points = [Point(i, 3 * i + 1) for i in range(20)]
+    from_points = analysers.get_analysis(points)
+    from_series = analysers.get_analysis(Series.from_points(points))
+    assert from_points == from_series
+    assert from_series['name'] == 'linear'
+
+
+def test_series_from_graphite():
+    "Graphite [value, timestamp] pairs, with None plotted at zero"
+    series = Series.from_graphite([[1.5, 100], [None, 110], [3, 120]])
+    assert series.x.tolist() == [100, 110, 120]
+    assert series.y.tolist() == [1.5, 0, 3]
+
+
+def test_series_integral():
+    "Series record whether their values were given as integers"
+    assert Series.from_graphite([[1, 100], [None, 110]]).integral
+    assert not Series.from_graphite([[1, 100], [2.0, 110]]).integral
+    assert Series.from_range(100, 10, [1, None, 3]).integral
+    assert not Series.from_range(100, 10, np.array([1.0])).integral
+    assert Series.from_graphite([[1, 100], [2, 110]])[::-1].integral
+
+
+def test_series_from_graphite_empty():
+    series = Series.from_graphite([])
+    assert len(series) == 0
+
+
+@pytest.mark.parametrize("datapoints", [
+    [[1, 100, 5], [2, 160, 6]],
+    [1, 100, 2, 160],
+    [[[1, 100]]],
+])
+def test_series_from_graphite_malformed(datapoints):
+    "Rows that aren't pairs are refused rather than reshaped into pairs"
+    with pytest.raises(ValueError):
+        Series.from_graphite(datapoints)
+
+
+def test_series_from_range():
+    "Compact series are spaced from start by step, with gaps plotted at zero"
+    series = Series.from_range(100, 10, [1.0, None, 3.0])
+    assert series.x.tolist() == [100, 110, 120]
+    assert series.y.tolist() == [1.0, 0.0, 3.0]
@@ -0,0 +1,202 @@
+# Copyright 2014 Tennessee Leeuwenburg
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"Tests of the HTTP describe service."
+import json
+import os
+import signal
+import threading
+import time
+from concurrent.futures import BrokenExecutor, ThreadPoolExecutor
+from http.client import HTTPConnection
+
+import pytest
+
+import wordgraph
+from wordgraph import server as wordgraph_server
+
+SERVER_REQUESTS = 'tests/data/server_requests.json'
+
+
+def raw_data():
+    with open(SERVER_REQUESTS, 'rb') as data:
+        return data.read()
+
+
+def start(**options):
+    options.setdefault('executor', ThreadPoolExecutor(2))
+    server = wordgraph_server.DescribeServer(('127.0.0.1', 0), **options)
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,))
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+def stop(server):
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def server():
+    server = start()
+    yield server
+    stop(server)
+
+
+def connect(server):
+    return HTTPConnection(*server.server_address, timeout=10)
+
+
+def request(connection, method, path, body=None):
+    connection.request(method, path, body)
+    response = connection.getresponse()
+    return response.status, response.read().decode('utf-8')
+
+
+def test_describe_with_keep_alive(server):
+    "Several sources are described over one connection"
+    expected = wordgraph.describe(raw_data(), source='graphite-json')
+    wrapped = json.dumps({'graphite_data': json.loads(raw_data().decode('utf-8'))})
+    connection = connect(server)
+
+    assert request(connection, 'POST', '/describe?source=graphite-json',
+            raw_data()) == (200, expected)
+    sock = connection.sock
+    assert request(connection, 'POST', '/describe', wrapped) == (200, expected)
+    assert connection.sock is sock
+
+
+def test_structured_output(server):
+    status, body = request(connect(server), 'POST',
+            '/describe?source=graphite-json&format=json&title=requests', raw_data())
+    result = json.loads(body)
+
+    assert status == 200
+    assert result['graph']['title'] == 'requests'
+    assert len(result['graph']['series']) == 4
+    assert 'requests' in result['text']
+
+
+@pytest.mark.parametrize("path, body, status", [
+    ('/describe?source=whisper', b'{}', 400),
+    ('/describe?max_points=many', b'{}', 400),
+    ('/describe', b'[1, 2', 400),
+    ('/describe', b'[]', 400),
+    ('/elsewhere', b'{}', 404),
+])
+def test_bad_requests(server, path, body, status):
+    assert request(connect(server), 'POST', path, body)[0] == status
+
+
+def test_limits():
+    "Oversized bodies and requests beyond the queue depth are refused"
+    server = start(max_body=100, max_queue=0)
+    try:
+        assert request(connect(server), 'POST', '/describe', raw_data())[0] == 413
+        assert request(connect(server), 'POST', '/describe', b'{}')[0] == 503
+        health = json.loads(request(connect(server), 'GET', '/health')[1])
+        assert health['rejected'] == 2
+        assert health['in_flight'] == 0
+    finally:
+        stop(server)
+
+
+def test_unsupported_language(server):
+    connection = connect(server)
+    status, body = request(connection, 'POST', '/describe?language=es', raw_data())
+    assert status == 400
+    assert "Unsupported language 'es'" in body
+    assert request(connection, 'POST', '/describe?demographic=expert', raw_data())[0] == 400
+    assert request(connection, 'POST', '/describe?source=graphite-json&language=English'
+            '&demographic=summary', raw_data())[0] == 200
+
+
+def test_timed_out_job_keeps_its_place(monkeypatch):
+    "A job which times out still counts against the queue until it finishes"
+    finish = threading.Event()
+    monkeypatch.setattr(wordgraph_server, '_describe_request',
+            lambda *args: finish.wait(10) and 'done')
+    server = start(executor=ThreadPoolExecutor(1), max_queue=1, timeout=0.1)
+    try:
+        connection = connect(server)
+        assert request(connection, 'POST', '/describe', b'{}')[0] == 504
+        assert request(connection, 'POST', '/describe', b'{}')[0] == 503
+        finish.set()
+        for attempt in range(100):
+            health = json.loads(request(connection, 'GET', '/health')[1])
+            if not health['in_flight']:
+                break
+            time.sleep(0.01)
+        assert health['in_flight'] == 0
+        assert request(connection, 'POST', '/describe', b'{}') == (200, 'done')
+    finally:
+        finish.set()
+        stop(server)
+
+
+def test_process_pool_and_health():
+    "The default pool is started up front, and its work is counted"
+    server = start(executor=None, workers=1)
+    try:
+        connection = connect(server)
+        assert request(connection, 'POST', '/describe?source=graphite-json',
+                raw_data())[0] == 200
+        status, body = request(connection, 'GET', '/health')
+        health = json.loads(body)
+        assert status == 200
+        assert health['workers'] == 1
+        assert health['requests'] == 1
+        assert health['described'] == 1
+        assert health['errors'] == 0
+    finally:
+        stop(server)
+
+
+def test_broken_pool_is_replaced():
+    "A pool whose workers have died is started again"
+    server = start(executor=None, workers=1)
+    try:
+        for pid in list(server.executor._processes):
+            os.kill(pid, signal.SIGKILL)
+        connection = connect(server)
+        assert request(connection, 'POST', '/describe?source=graphite-json',
+                raw_data())[0] == 503
+        assert request(connection, 'POST', '/describe?source=graphite-json',
+                raw_data())[0] == 200
+        status, body = request(connection, 'GET', '/health')
+        health = json.loads(body)
+        assert status == 200
+        assert health['status'] == 'ok'
+        assert health['restarts'] == 1
+        assert health['in_flight'] == 0
+    finally:
+        stop(server)
+
+
+def test_broken_executor_is_reported(monkeypatch):
+    "A pool the server was given is not replaced, but reported as broken"
+    def broken(*args):
+        raise BrokenExecutor()
+    monkeypatch.setattr(wordgraph_server, '_describe_request', broken)
+    server = start()
+    try:
+        connection = connect(server)
+        assert request(connection, 'POST', '/describe', b'{}')[0] == 503
+        status, body = request(connection, 'GET', '/health')
+        assert status == 503
+        assert json.loads(body)['status'] == 'broken'
+        assert json.loads(body)['restarts'] == 0
+    finally:
+        stop(server)
@@ -0,0 +1,107 @@
+# Copyright 2014 Tennessee Leeuwenburg
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"Tests of reading graphite JSON output incrementally."
+import io
+import json
+import os
+
+import pytest
+
+import wordgraph
+from wordgraph import streaming
+
+DATA = os.path.join(os.path.dirname(__file__), 'data')
+
+
+def read(name):
+    with open(os.path.join(DATA, name), 'rb') as data_file:
+        return data_file.read()
+
+
+@pytest.mark.parametrize("name", ['server_requests.json', 'memory_usage.json'])
+@pytest.mark.parametrize("chunk_size", [5, 64, streaming.CHUNK_SIZE])
+def test_matches_json_module(name, chunk_size):
+    raw = read(name)
+    expected = json.loads(raw.decode('utf-8'))
+    parsed = streaming.load_graphite(raw, chunk_size)
+
+    assert len(parsed) == len(expected)
+    for series, reference in zip(parsed, expected):
+        assert series['target'] == reference['target']
+        assert series['datapoints'].x.tolist() == [p[1] for p in reference['datapoints']]
+        assert series['datapoints'].y.tolist() == [p[0] or 0 for p in reference['datapoints']]
+
+
+def test_nulls_and_extra_keys():
+    raw = ('[{"tags": {"name": "a,b]"}, "datapoints": [[null, 10], [2.5e1, 20],'
+           ' [-3, 30]], "target": "x"}, {"target": "y", "datapoints": []}]')
+    first, second = streaming.load_graphite(io.StringIO(raw), chunk_size=3)
+
+    assert first['tags'] == {'name': 'a,b]'}
+    assert first['datapoints'].x.tolist() == [10, 20, 30]
+    assert first['datapoints'].y.tolist() == [0, 25, -3]
+    assert second['target'] == 'y'
+    assert len(second['datapoints']) == 0
+
+
+def test_empty_response():
+    assert streaming.load_graphite(b' [ ] ') == []
+
+
+@pytest.mark.parametrize("raw", [
+    b'',
+    b'{}',
+    b'[{"target": "x", "datapoints": [[1, 2], [3]]}]',
+    b'[{"target": "x", "datapoints": [[1, 2], [3, "a"]]}]',
+    b'[{"target": "x", "datapoints": [[1, 100, 5], [2, 160, 6]]}]',
+    b'[{"target": "x", "datapoints": [[1, 2]',
+    b'[{"target": "x"',
+])
+@pytest.mark.parametrize("chunk_size", [4, streaming.CHUNK_SIZE])
+def test_malformed(raw, chunk_size):
+    with pytest.raises(ValueError):
+        streaming.load_graphite(raw, chunk_size=chunk_size)
+
+
+def many_small_series(count):
+    return [{'target': 'servers.{0}.cpu'.format(index),
+             'tags': {'name': 'servers.{0}.cpu'.format(index), 'note': 'a "quoted" }] \u00e9'},
+             'datapoints': [[None if point == 3 else float(index + point), 60 * point]
+                 for point in range(index % 7)]}
+        for index in range(count)]
+
+
+@pytest.mark.parametrize("chunk_size", [7, 1000, 1 << 20])
+def test_many_small_series(chunk_size):
+    expected = many_small_series(300)
+    # Non-ASCII text too, and one series too long to be decoded whole
+    expected[5]['datapoints'] = [[1.0, 60 * point] for point in range(2000)]
+    raw = json.dumps(expected, ensure_ascii=False).encode('utf-8')
+    parsed = streaming.load_graphite(raw, chunk_size)
+
+    assert [series['tags'] for series in parsed] == [series['tags'] for series in expected]
+    for series, reference in zip(parsed, expected):
+        assert series['datapoints'].x.tolist() == [p[1] for p in reference['datapoints']]
+        assert series['datapoints'].y.tolist() == [p[0] or 0 for p in reference['datapoints']]
+
+
+def test_describe_raw_response():
+    raw = read('server_requests.json')
+    expected = wordgraph.describe({'graphite_data': json.loads(raw.decode('utf-8'))},
+            source='graphite')
+
+    assert wordgraph.describe(raw, source='graphite-json') == expected
+    assert wordgraph.describe(io.BytesIO(raw), source='graphite-json') == expected
+    assert wordgraph.describe({'graphite_data': raw}, source='graphite-json') == expected
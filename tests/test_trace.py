@@ -0,0 +1,187 @@
+# Copyright 2014 Tennessee Leeuwenburg
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"Tests of tracing the stages of a description."
+import io
+import json
+import pickle
+import threading
+import tracemalloc
+
+import pytest
+
+import wordgraph
+from wordgraph import analysers, grapher, trace
+from .utilities import to_graphite_metric
+
+
+def graph_data():
+    return {'graphite_data':
+            to_graphite_metric([1.0, 2.0, 3.0, 4.0], name='up') +
+            to_graphite_metric([4.0, 8.0, 4.0, 1.0], name='peak')}
+
+
+def test_describe_spans(capsys):
+    collector = trace.Collector()
+    text = wordgraph.describe(graph_data(), source='graphite', max_points=3,
+            tracer=collector)
+
+    assert text == wordgraph.describe(graph_data(), source='graphite', max_points=3)
+    assert capsys.readouterr().out == ''
+    names = [span.name for span in collector.spans]
+    for stage in ('describe', 'ingest', 'series', 'fixed_interval', 'downsample',
+            'analyser', 'realise', 'format_dates', 'render'):
+        assert stage in names
+    assert names[-1] == 'describe'
+    assert all(span.duration >= 0 for span in collector.spans)
+    assert set(collector.timings()) == set(names)
+
+    series = collector.find('series')
+    assert [span.attributes['target'] for span in series] == ['up', 'peak']
+    assert [span.parent.name for span in series] == ['ingest', 'ingest']
+    assert collector.find('ingest')[0].parent.name == 'describe'
+
+    scores = collector.find('analyser')
+    assert len(scores) == 2 * len(analysers._analysers)
+    assert scores[0].parent is series[0]
+    linear = [span for span in scores if span.attributes['analyser'] == 'linear']
+    assert linear[0].attributes['validity'] == pytest.approx(1.0)
+
+
+def test_cache_hit_span():
+    collector = trace.Collector()
+    cache = wordgraph.DescriptionCache()
+    for attempt in range(2):
+        wordgraph.describe(graph_data(), source='graphite', cache=cache, tracer=collector)
+    assert [span.attributes['cache'] for span in collector.find('describe')] == [False, True]
+
+
+def test_callback_and_errors():
+    finished = []
+    collector = trace.Collector(callback=finished.append)
+    with pytest.raises(KeyError):
+        wordgraph.describe({}, source='graphite', tracer=collector)
+
+    assert finished == collector.spans
+    assert [span.name for span in finished] == ['ingest', 'describe']
+    assert "KeyError" in finished[0].attributes['error']
+
+
+def test_null_tracer():
+    with trace.NULL.span('stage', points=1) as span:
+        span.set(validity=1)
+    trace.NULL.event('stage')
+    assert pickle.loads(pickle.dumps(trace.NULL)) is trace.NULL
+
+
+def test_describe_many_tracer():
+    collector = trace.Collector()
+    descriptions = list(wordgraph.describe_many([graph_data()] * 2, source='graphite',
+            workers=1, tracer=collector))
+    assert all(description.error is None for description in descriptions)
+    assert len(collector.find('describe')) == 2
+
+    with pytest.raises(ValueError):
+        list(wordgraph.describe_many([graph_data()], source='graphite', workers=2,
+                tracer=collector))
+
+
+def test_memory_collector_nesting():
+    collector = trace.MemoryCollector()
+    with collector.span('outer'):
+        kept = bytearray(100000)
+        with collector.span('inner'):
+            temporary = bytearray(400000)
+            del temporary
+    inner, outer = collector.spans
+
+    assert not tracemalloc.is_tracing()
+    assert 400000 <= inner.attributes['memory_peak'] < 450000
+    assert inner.attributes['memory_allocated'] < 10000
+    assert 100000 <= outer.attributes['memory_allocated'] < 150000
+    assert outer.attributes['memory_peak'] >= 500000
+    memory = collector.memory()
+    assert memory['peak'] == outer.attributes['memory_peak']
+    assert list(memory['stages']) == ['inner', 'outer']
+
+
+def test_memory_collector_without_reset_peak(monkeypatch):
+    "Before Python 3.9, peaks are known when they are the highest so far"
+    monkeypatch.delattr(tracemalloc, 'reset_peak', raising=False)
+    collector = trace.MemoryCollector()
+    with collector.span('outer'):
+        with collector.span('first'):
+            temporary = bytearray(400000)
+            del temporary
+        with collector.span('second'):
+            kept = bytearray(100000)
+    first, second, outer = collector.spans
+
+    assert 400000 <= first.attributes['memory_peak'] < 450000
+    assert 100000 <= second.attributes['memory_peak'] < 150000
+    assert 100000 <= outer.attributes['memory_allocated'] < 150000
+    assert outer.attributes['memory_peak'] >= 400000
+
+
+def test_memory_collector_other_thread():
+    "A span finishing on another thread leaves tracing to the one that started it"
+    collector = trace.MemoryCollector()
+
+    def inner():
+        with collector.span('inner'):
+            pass
+
+    with collector.span('outer'):
+        worker = threading.Thread(target=inner)
+        worker.start()
+        worker.join()
+        assert tracemalloc.is_tracing()
+        kept = bytearray(100000)
+    assert not tracemalloc.is_tracing()
+    outer = collector.find('outer')[0]
+    assert 100000 <= outer.attributes['memory_allocated'] < 150000
+
+
+def test_describer_memory_mode():
+    describer = wordgraph.Describer(source='graphite', memory=True)
+    result = describer.description(graph_data())
+
+    assert result.text == wordgraph.describe(graph_data(), source='graphite')
+    assert result.memory['peak'] > 0
+    assert {'describe', 'ingest', 'series', 'analyser', 'render'} <= set(result.memory['stages'])
+    with pytest.raises(ValueError):
+        describer.description(graph_data(), tracer=trace.Collector())
+    with pytest.raises(ValueError):
+        describer.description(graph_data(), threads=4)
+
+
+def test_release_data_lowers_peak():
+    "Streamed series are freed as soon as they are analysed, unless kept"
+    raw = json.dumps([to_graphite_metric([float(i % 7) for i in range(5000)],
+        name='s{0}'.format(number))[0] for number in range(20)]).encode('utf-8')
+    peaks = {}
+    for retain_data in (True, False):
+        describer = wordgraph.Describer(source='graphite-json', memory=True,
+                retain_data=retain_data)
+        result = describer.description(io.BytesIO(raw))
+        peaks[retain_data] = result.memory['stages']['ingest']['peak']
+        assert result.text == wordgraph.describe(raw, source='graphite-json')
+    # Only the raw data, which the caller holds anyway, is retained
+    assert peaks[True] < peaks[False] * 1.5
+
+    graph = grapher.GraphiteGraph(retain_data=False)
+    graph.auto_ingest(graph_data())
+    assert graph.raw_data is None
+    with pytest.raises(ValueError):
+        list(graph.iter_series())
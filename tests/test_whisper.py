@@ -0,0 +1,117 @@
+# Copyright 2014 Tennessee Leeuwenburg
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"Tests of reading Whisper files."
+import math
+import os
+import struct
+
+import pytest
+
+import wordgraph
+from wordgraph import whisper
+
+
+def create(path, archives, points):
+    '''
+    Write a Whisper file with the given (seconds_per_point, points) archives,
+    the first of which holds points, a list of (timestamp, value) pairs.
+    Points are placed in the ring the way whisper itself places them.
+    '''
+    header_size = 16 + 12 * len(archives)
+    offset = header_size
+    infos = []
+    for seconds_per_point, count in archives:
+        infos.append((offset, seconds_per_point, count))
+        offset += 12 * count
+    data = bytearray(offset)
+    max_retention = max(step * count for step, count in archives)
+    struct.pack_into('!2LfL', data, 0, 1, max_retention, 0.5, len(archives))
+    for index, info in enumerate(infos):
+        struct.pack_into('!3L', data, 16 + 12 * index, *info)
+    archive_offset, step, count = infos[0]
+    if points:
+        base = points[0][0]
+        for timestamp, value in points:
+            slot = ((timestamp - base) // step) % count
+            struct.pack_into('!Ld', data, archive_offset + 12 * slot, timestamp, value)
+    with open(path, 'wb') as whisper_file:
+        whisper_file.write(bytes(data))
+
+
+def values(series):
+    return [None if math.isnan(value) else value for value in series['values']]
+
+
+def test_read_wrapped_ring(tmpdir):
+    "The ring is read from its oldest point, across the end of the archive"
+    path = str(tmpdir.join('load.wsp'))
+    create(path, [(60, 10)], [(6000 + 60 * i, float(i)) for i in range(15)])
+    series = whisper.read(path, now=6840)
+
+    assert series['name'] == 'load'
+    assert series['start'] == 6300
+    assert series['step'] == 60
+    assert series['end'] == 6900
+    assert values(series) == [float(i) for i in range(5, 15)]
+
+
+def test_read_time_range_and_gaps(tmpdir):
+    "Missing and stale points are NaN, and the range is honoured"
+    path = str(tmpdir.join('load.wsp'))
+    written = [(6000 + 60 * i, float(i)) for i in range(15) if i != 12]
+    create(path, [(60, 10)], written)
+    series = whisper.read(path, from_time=6600, until_time=6780, now=6840)
+
+    assert series['start'] == 6660
+    assert values(series) == [11.0, None, 13.0]
+
+
+def test_best_archive(tmpdir):
+    "A range longer than the finest archive is read from a coarser one"
+    path = str(tmpdir.join('load.wsp'))
+    create(path, [(60, 10), (300, 12)], [])
+    with whisper.WhisperFile(path) as whisper_file:
+        assert whisper_file.fetch(6240, now=6840)[1] == 60
+        start, step, data = whisper_file.fetch(4000, now=6840)
+    assert step == 300
+    assert start == 4200
+    assert len(data) == 9
+    assert all(math.isnan(value) for value in data)
+
+
+def test_invalid_file(tmpdir):
+    path = tmpdir.join('broken.wsp')
+    path.write_binary(b'not whisper')
+    with pytest.raises(ValueError):
+        whisper.read(str(path))
+
+
+def test_describe_directory(tmpdir):
+    "A directory tree is described like the same series in compact form"
+    for server, slope in (('a', 1.0), ('b', 3.0)):
+        directory = tmpdir.join('servers', server)
+        directory.ensure(dir=True)
+        create(str(directory.join('requests.wsp')), [(60, 60)],
+                [(6000 + 60 * i, slope * i) for i in range(60)])
+    tmpdir.join('servers', 'README').write('not a metric')
+
+    root = str(tmpdir.join('servers'))
+    series = list(whisper.walk(root, now=6000 + 60 * 59))
+    assert [s['name'] for s in series] == ['a.requests', 'b.requests']
+
+    text = wordgraph.describe({'path': root, 'now': 6000 + 60 * 59}, source='whisper')
+    expected = wordgraph.describe({'graphite_data': series}, source='graphite-compact')
+    assert text == expected
+    assert 'a.requests' in text
@@ -13,6 +13,9 @@
 # limitations under the License.
 
 from .describer import describe
+from .describer import describe_async
+from .describer import describe_many
 from .describer import Describer
+from .describer import DescriptionCache
 
-__all__ = ['describe']
+__all__ = ['describe', 'describe_async', 'describe_many']
@@ -0,0 +1,48 @@
+# Copyright 2014 Tennessee Leeuwenburg
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+Deferred imports, to keep "import wordgraph" cheap.
+
+numpy, jinja2 and friends take far longer to import than wordgraph itself,
+and many programs import wordgraph long before (or without ever) describing
+a graph. Modules which need them at call time only bind a stand-in with
+lazy_import(), which performs the real import on first attribute access.
+'''
+
+import importlib
+
+
+class _LazyModule(object):
+
+    def __init__(self, name):
+        self.__dict__['_lazy_name'] = name
+
+    def __getattr__(self, attribute):
+        # Only called for attributes not yet copied across. The import
+        # machinery serialises concurrent first imports.
+        module = importlib.import_module(self._lazy_name)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attribute)
+
+    def __repr__(self):
+        return "<lazily imported module {0!r}>".format(self._lazy_name)
+
+
+def lazy_import(name):
+    '''
+    Return a stand-in for the named module, which is imported when one of
+    its attributes is first used.
+    '''
+    return _LazyModule(name)
@@ -18,7 +18,8 @@ Analysers are used to process a single series, and
 produce structured output describing the series.
 
 As a user of this module, you will usually simply invoke
-get_analysis(points).
+get_analysis(points). Many series which share the same x values can
+be analysed together with get_aligned_analyses(x_values, y_values).
 
 Analysers do not care about things like axis labels; they
 only need to find the best way of representing the data in
@@ -27,10 +28,21 @@ the graph.
 The analysers' results are language agnostic, and will be
 translated into natural language elsewhere.
 
+The points may be supplied either as a points.Series, which is the
+efficient form used by the graphers, or as any sequence of points.Point
+objects, which will be converted to a Series first.
+
+get_analysis() sorts the series once and wraps it in a SeriesContext,
+along with summary statistics which are computed once and shared by every
+analyser. New analysers should take what they need from self.context
+rather than scanning self.points again.
+
 To add a new analyser, simply subclass the FixedIntervalAnalyser and
 implement the two methods. get_validity() will be used to asses which
 analyser is most suitable for describing the data, while get_result()
-does the actual analysis. Then add it to the list of analysers.
+does the actual analysis. Then add it to the list of analysers. The
+framework only calls these through evaluate(), which runs each of them
+once and caches the outcome as an Evaluation on the analyser.
 
 Note that the values passed into the analysers are just the y-values;
 you should not need to know the x-values, and you can assume the x distance
@@ -49,7 +61,14 @@ except ImportError:
         print("Continuing unsafely. Upgrade to python 3.4! Could not find module 'statistics")
 
 import math
-import numpy as np
+from collections import namedtuple
+
+from . import trace
+from ._lazy import lazy_import
+from .downsample import reduce as reduce_series
+from .points import Series, as_series
+
+np = lazy_import('numpy')
 
 
 def phi(x):
@@ -66,14 +85,144 @@ def phi(x):
     '''
     return (1.0 + math.erf(x / math.sqrt(2.0))) / 2.0
 
+
+def erf(x_values):
+    '''
+    Error function over a whole array at once.
+
+    Uses the Chebyshev fit to erfc from Numerical Recipes, which has a
+    fractional error below 1.2e-7 everywhere. As with phi, this avoids
+    needing scipy.
+    '''
+    z = np.abs(x_values)
+    t = 1.0 / (1.0 + 0.5 * z)
+    erfc = t * np.exp(-z * z - 1.26551223 + t * (1.00002368 + t * (0.37409196 +
+        t * (0.09678418 + t * (-0.18628806 + t * (0.27886807 + t * (-1.13520398 +
+        t * (1.48851587 + t * (-0.82215223 + t * 0.17087277)))))))))
+    return np.where(np.asarray(x_values) >= 0, 1.0 - erfc, erfc - 1.0)
+
+
+def cumulative_area(x_values, y_values, minimum_y):
+    '''
+    Running area under a series sorted by x, measured up from minimum_y,
+    as used by the NormalDistribution analyser. The first entry is 0.
+
+    Works along the last axis, so a 2D array of y values (with minimum_y
+    shaped to broadcast against it) gives one running area per row.
+    '''
+    y_values = np.asarray(y_values, dtype='float64')
+    steps = np.minimum(y_values[..., 1:], y_values[..., :-1])
+    steps -= minimum_y
+    # Half the rise times the run, worked in place to save temporary arrays
+    rise = np.diff(y_values, axis=-1)
+    np.abs(rise, out=rise)
+    rise *= np.diff(x_values)
+    rise *= .5
+    steps += rise
+    area = np.empty(y_values.shape)
+    area[..., 0] = 0
+    np.cumsum(steps, axis=-1, out=area[..., 1:])
+    return area
+
+
+def quantile_x(x_values, area, target_size):
+    '''
+    Binary search a running area (see cumulative_area) for the x value
+    with target_size of the area to its left, interpolating linearly
+    between points. Returns None if there are fewer than two points.
+    '''
+    right = max(np.searchsorted(area, target_size, side='left'), 1)
+    if right >= len(area):
+        return None
+    left = right - 1
+    left_x, right_x = x_values[left].item(), x_values[right].item()
+    left_size, right_size = area[left].item(), area[right].item()
+    if left_size == right_size:
+        return (right_x + left_x) / 2.
+    proportion_across = (target_size - left_size) / (right_size - left_size)
+    return left_x + (right_x - left_x) * proportion_across
+
+class SeriesContext(namedtuple('BaseSeriesContext', [
+        'series', 'n',
+        'min_x', 'max_x', 'min_y', 'max_y',
+        'first', 'last',
+        'linear_fit', 'area'], defaults=(None, None))):
+    """
+    A series sorted by x value, together with the summary statistics
+    which the analysers have in common.
+
+    The series arrays are read-only views, so a context can safely be shared
+    between every analyser looking at the same data. The statistics are None
+    for an empty series.
+
+    Callers which already maintain a RunningLinearFit and running area for
+    the series (see cumulative_area) can supply them with from_running, and
+    the analysers will use them instead of computing their own.
+    """
+
+    @staticmethod
+    def _read_only(ordered):
+        x = ordered.x.view()
+        y = ordered.y.view()
+        x.flags.writeable = False
+        y.flags.writeable = False
+        return Series(x, y, dtype=ordered.dtype, integral=ordered.integral)
+
+    @classmethod
+    def from_points(cls, points):
+        if isinstance(points, cls):
+            return points
+        series = cls._read_only(as_series(points).sorted())
+        x, y = series.x, series.y
+        if not len(series):
+            return cls(series, 0, *([None] * 6))
+        return cls(series=series,
+                n=len(series),
+                min_x=x[0].item(),
+                max_x=x[-1].item(),
+                min_y=y.min().item(),
+                max_y=y.max().item(),
+                first=series[0],
+                last=series[-1])
+
+    @classmethod
+    def from_running(cls, series, linear_fit, area, min_y, max_y):
+        '''
+        Build a context for a non-empty series which is already in x order,
+        without scanning the series for its extremes.
+        '''
+        series = cls._read_only(series)
+        return cls(series=series,
+                n=linear_fit.n,
+                min_x=series.x[0].item(),
+                max_x=series.x[-1].item(),
+                min_y=min_y,
+                max_y=max_y,
+                first=series[0],
+                last=series[-1],
+                linear_fit=linear_fit,
+                area=area)
+
+
+class Evaluation(namedtuple('BaseEvaluation', ['name', 'validity', 'result'])):
+    """
+    The outcome of running a single analyser over a series.
+    """
+
+
 class FixedIntervalAnalyser():
     """
     Given a series of y-values, associated
     with fixed x-axis increments, provide
     analysis of it.
+
+    Accepts either a SeriesContext, or anything SeriesContext.from_points
+    can build one from.
     """
     def __init__(self, points):
-        self.points = sorted((point for point in points), key=lambda p: p.x)
+        self.context = SeriesContext.from_points(points)
+        self.points = self.context.series
+        self._evaluation = None
 
     def get_validity(self):
         """
@@ -91,8 +240,129 @@ class FixedIntervalAnalyser():
         """
         return NotImplementedError()
 
+    def evaluate(self):
+        """
+        Returns an Evaluation holding this analyser's validity and
+        result. They are computed on the first call only.
+        """
+        if self._evaluation is None:
+            validity = self.get_validity()
+            self._evaluation = Evaluation(self.name, validity, self.get_result())
+        return self._evaluation
+
     def __str__(self):
-        return "{0} [{1}]".format(self.name, self.get_validity())
+        return "{0} [{1}]".format(self.name, self.evaluate().validity)
+
+
+class RunningLinearFit(object):
+    """
+    Least squares straight line fit, kept as running sums.
+
+    Rather than raw sums of x and x squared, which lose all precision for
+    x values such as unix timestamps, this keeps the means together with
+    the sums of squares and products of deviations from those means.
+    Points can be added one at a time with add(), or a whole array at a
+    time with update(); either way the cost is O(n) with no refitting.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.sxx = 0.0
+        self.sxy = 0.0
+        self.syy = 0.0
+
+    def add(self, x, y):
+        """
+        Add a single point to the fit.
+        """
+        self.n += 1
+        dx = x - self.mean_x
+        dy = y - self.mean_y
+        self.mean_x += dx / self.n
+        self.mean_y += dy / self.n
+        self.sxx += dx * (x - self.mean_x)
+        self.sxy += dx * (y - self.mean_y)
+        self.syy += dy * (y - self.mean_y)
+
+    def update(self, x_values, y_values):
+        """
+        Add arrays of points to the fit, merging their centred sums with
+        the ones already held.
+        """
+        count = len(x_values)
+        if not count:
+            return
+        mean_x = np.mean(x_values).item()
+        mean_y = np.mean(y_values).item()
+        dx = np.subtract(x_values, mean_x)
+        dy = np.subtract(y_values, mean_y)
+        self._merge(count, mean_x, mean_y,
+                np.dot(dx, dx).item(), np.dot(dx, dy).item(), np.dot(dy, dy).item())
+
+    def downdate(self, x_values, y_values):
+        """
+        Remove arrays of points which were previously added to the fit.
+        """
+        count = len(x_values)
+        if not count:
+            return
+        if count >= self.n:
+            self.__init__()
+            return
+        mean_x = np.mean(x_values).item()
+        mean_y = np.mean(y_values).item()
+        dx = np.subtract(x_values, mean_x)
+        dy = np.subtract(y_values, mean_y)
+
+        # The reverse of _merge: find the means of the points which remain,
+        # then take away the removed points' sums and the shift between them.
+        remaining = self.n - count
+        remaining_x = (self.n * self.mean_x - count * mean_x) / remaining
+        remaining_y = (self.n * self.mean_y - count * mean_y) / remaining
+        shift_x = mean_x - remaining_x
+        shift_y = mean_y - remaining_y
+        weight = remaining * count / self.n
+        self.sxx -= np.dot(dx, dx).item() + shift_x * shift_x * weight
+        self.sxy -= np.dot(dx, dy).item() + shift_x * shift_y * weight
+        self.syy -= np.dot(dy, dy).item() + shift_y * shift_y * weight
+        self.mean_x = remaining_x
+        self.mean_y = remaining_y
+        self.n = remaining
+
+    def _merge(self, count, mean_x, mean_y, sxx, sxy, syy):
+        total = self.n + count
+        shift_x = mean_x - self.mean_x
+        shift_y = mean_y - self.mean_y
+        weight = self.n * count / total
+        self.sxx += sxx + shift_x * shift_x * weight
+        self.sxy += sxy + shift_x * shift_y * weight
+        self.syy += syy + shift_y * shift_y * weight
+        self.mean_x += shift_x * count / total
+        self.mean_y += shift_y * count / total
+        self.n = total
+
+    @property
+    def gradient(self):
+        if self.sxx == 0:
+            return 0.0
+        return self.sxy / self.sxx
+
+    @property
+    def constant(self):
+        return self.mean_y - self.gradient * self.mean_x
+
+    @property
+    def residual_variance(self):
+        """
+        Variance of the distances from the points to the fitted line.
+        """
+        if self.n == 0:
+            return 0.0
+        if self.sxx == 0:
+            return self.syy / self.n
+        return max(self.syy - self.sxy * self.sxy / self.sxx, 0.0) / self.n
 
 
 class LinearDistribution(FixedIntervalAnalyser):
@@ -100,18 +370,17 @@ class LinearDistribution(FixedIntervalAnalyser):
     name = "linear"
 
     def get_validity(self):
-        x_values = [point.x for point in self.points]
-        y_values = [point.y for point in self.points]
-        par = np.polyfit(x_values, y_values, 1, full=True)
+        self.fit = self.context.linear_fit
+        if self.fit is None:
+            self.fit = RunningLinearFit()
+            self.fit.update(self.points.x, self.points.y)
 
-        self.gradient = par[0][0]
-        self.constant = par[0][1]
+        self.gradient = self.fit.gradient
+        self.constant = self.fit.constant
 
-        residuals = np.var([(self.gradient * point.x + self.constant - point.y)
-            for point in self.points])
         # variance = np.var(y_values)
         # Rsqr = np.round(1 - residuals / variance, decimals=2)
-        return 1 - residuals
+        return 1 - self.fit.residual_variance
 
     def get_result(self):
         return dict(gradient=self.gradient,
@@ -130,32 +399,19 @@ class NormalDistribution(FixedIntervalAnalyser):
         Given a potentially very blocky graph, interpolate
         a y value at an arbitrary x value across the graph.
         """
-        left_point = None
-        for point in self.points:
-            if point.x <= x_value:
-                left_point = point
-            else:
-                right_point = point
-                proportion_across = (x_value - left_point.x) \
-                        / (right_point.x - left_point.x)
-                return (left_point.y +
-                        proportion_across * (right_point.y - left_point.y))
-        assert False, "Fallen off the end of the graph"
+        assert self.points.x[0] <= x_value < self.points.x[-1], \
+                "Fallen off the end of the graph"
+        return np.interp(x_value, self.points.x, self.points.y)
 
     @property
     def total_size(self):
         if self._total_size is None:
-            self._cumulative_size = dict()
-            self._minimum_y = min(point.y for point in self.points)
-
-            previous_point = None
-            for point in self.points:
-                if previous_point is None:
-                    self._cumulative_size[point.x] = 0
-                else:
-                    self._cumulative_size[point.x] = self._cumulative_size[previous_point.x] + .5 * (point.x - previous_point.x) * (max(point.y, previous_point.y) - min(point.y, previous_point.y)) + (min(point.y, previous_point.y) - self._minimum_y)
-                previous_point = point
-            self._total_size = self._cumulative_size[point.x]
+            self._minimum_y = self.context.min_y
+            self._cumulative_size = self.context.area
+            if self._cumulative_size is None:
+                self._cumulative_size = cumulative_area(
+                        self.points.x, self.points.y, self._minimum_y)
+            self._total_size = self._cumulative_size[-1].item()
         return self._total_size
 
     def x_value_at(self, proportion):
@@ -165,16 +421,7 @@ class NormalDistribution(FixedIntervalAnalyser):
         """
         assert 0 <= proportion <= 1
         target_size = self.total_size * proportion
-        sizes = sorted(self._cumulative_size.items())
-        for left, right in zip(sizes, sizes[1:]):
-            left_x, left_size = left
-            right_x, right_size = right
-            if target_size > right_size:
-                continue
-            if left_size == right_size:
-                return (right_x + left_x) / 2.
-            proportion_across = (target_size - left_size) / (right_size - left_size)
-            return left_x + (right_x - left_x) * proportion_across
+        return quantile_x(self.points.x, self._cumulative_size, target_size)
 
     def _estimate_stddev(self):
         """
@@ -214,8 +461,6 @@ class NormalDistribution(FixedIntervalAnalyser):
         """
         self.mean = self.x_value_at(.5)
         self.stddev = self._estimate_stddev()
-        y_scale = max(point.y for point in self.points) \
-            - min(point.y for point in self.points)
         if self.stddev == 0:
             return 0
 
@@ -223,17 +468,12 @@ class NormalDistribution(FixedIntervalAnalyser):
         #         (point.x, stats.norm.cdf((point.x - self.mean) / self.stddev))
         #     for point in self.points)
 
-        cum_points = [(point.x, phi((point.x - self.mean) / self.stddev)) for point in self.points]
-        ideal_cumulative = dict(cum_points)
-
-        devtest = [(point.x, ideal_cumulative[point.x],
-            (self._cumulative_size[point.x] / self.total_size),
-            y_scale) for point in self.points]
+        ideal_cumulative = (1.0 + erf((self.points.x - self.mean)
+            / (self.stddev * math.sqrt(2.0)))) / 2.0
 
-        deviations = [(point.x, abs(ideal_cumulative[point.x] -
-            (self._cumulative_size[point.x] / self.total_size))
-            ) for point in self.points]
-        average_deviation = sum(abs(d[1]) for d in deviations) / len(self.points)
+        deviations = np.abs(ideal_cumulative -
+            (self._cumulative_size / self.total_size))
+        average_deviation = deviations.mean().item()
         return abs(1 - average_deviation)
 
     def get_result(self):
@@ -259,40 +499,246 @@ _analysers = [NormalDistribution,
         LinearDistribution]
 
 
-def get_best_analyser(values):
+def get_best_analyser(values, tracer=None):
     """
     Instantiate a bunch of analysers and return the one
     which suits this data best.
+
+    Each analyser is evaluated in an 'analyser' span of the tracer, which
+    records the analyser's name and validity.
     """
-    candidates = sorted(
-            (analyser(values) for analyser in _analysers),
-            key=lambda a: a.get_validity())
-    print([str(c) for c in candidates])
+    if tracer is None:
+        tracer = trace.NULL
+    context = SeriesContext.from_points(values)
+    candidates = []
+    for analyser_type in _analysers:
+        analyser = analyser_type(context)
+        with tracer.span('analyser', analyser=analyser.name) as span:
+            span.set(validity=analyser.evaluate().validity)
+        candidates.append(analyser)
+    candidates.sort(key=lambda a: a.evaluate().validity)
     return candidates[-1]
 
 
+class IntervalError(ValueError):
+    """
+    Raised when the x values of a series are not evenly spaced. The index
+    is that of the first point (in x order) after the offending gap.
+    """
+    def __init__(self, message, index=None):
+        super(IntervalError, self).__init__(message)
+        self.index = index
+
+
 def assert_fixed_interval(points):
-    x_values = sorted(point.x for point in points)
+    """
+    Raise a ValueError unless the x values are evenly spaced, to within 1%.
+
+    Input which is already in x order (the usual case for graphite) is
+    checked without sorting it.
+    """
+    if isinstance(points, SeriesContext):
+        x_values = points.series.x
+    else:
+        x_values = as_series(points).x
+    _assert_fixed_x_interval(x_values)
+
+
+def _assert_fixed_x_interval(x_values):
     if len(x_values) < 1:
         raise ValueError("it contains no data points!")
     if len(x_values) == 1:
-        pass
-    else:
-        expected_interval_size = (x_values[-1] - x_values[0]) / (len(x_values) - 1)
-        for left, right in zip(x_values, x_values[1:]):
-            if abs(1 - ((right - left) / expected_interval_size)) > 0.01:
-               raise ValueError("Intervals on the X axis are not fixed width")
+        return
+    gaps = np.diff(x_values)
+    if (gaps < 0).any():
+        x_values = np.sort(x_values)
+        gaps = np.diff(x_values)
+    expected_interval_size = (x_values[-1] - x_values[0]) / (len(x_values) - 1)
+    uneven = np.abs(gaps - expected_interval_size) > 0.01 * expected_interval_size
+    if expected_interval_size == 0 or uneven.any():
+        index = int(np.argmax(uneven)) + 1
+        raise IntervalError("Intervals on the X axis are not fixed width "
+                "(at point {0})".format(index), index=index)
+
+
+def _reduced_context(context, max_points, downsample):
+    """
+    Reduce the series of a context with the named downsample method.
+
+    The points kept by a shape-preserving method are unevenly spaced and
+    favour peaks and troughs, so the running area and linear fit are
+    taken from the full series (or from the context, if it already has
+    them) and only sampled at the kept points.
+    """
+    series = context.series
+    reduced = SeriesContext.from_points(
+            reduce_series(series, max_points, downsample))
+    linear_fit, area = context.linear_fit, context.area
+    if linear_fit is None:
+        linear_fit = RunningLinearFit()
+        linear_fit.update(series.x, series.y)
+    if area is None:
+        area = cumulative_area(series.x, series.y, context.min_y)
+    kept = np.searchsorted(series.x, reduced.series.x)
+    return reduced._replace(min_y=context.min_y, max_y=context.max_y,
+            linear_fit=linear_fit, area=area[kept])
+
+
+def get_analysis(points, max_points=None, downsample='lttb', fixed_interval=False,
+        tracer=None):
+    """
+    Analyse a series and return a dict describing the best fitting analyser.
+
+    If max_points is given, longer series are checked for fixed intervals at
+    full length, then reduced to about max_points points with the named
+    downsample method (see the downsample module) before the analysers run.
+    The analysers still see the extremes, linear fit and running area of the
+    full series, so the reduction does not skew the statistics they report.
 
+    fixed_interval=True skips the interval check, for series whose x values
+    are known to be evenly spaced because they were generated that way.
 
-def get_analysis(points):
+    The stages are timed as spans of the tracer, if given; see the trace module.
+    """
+    if tracer is None:
+        tracer = trace.NULL
+    context = SeriesContext.from_points(points)
     try:
-        assert_fixed_interval(points=points)
+        if not (fixed_interval and context.n):
+            with tracer.span('fixed_interval'):
+                assert_fixed_interval(points=context)
     except ValueError as ex:
         return dict(name=UNPROCESSABLE,
                 result=str(ex))
-    y_values = [point.y for point in sorted(points)]
-    analyser = get_best_analyser(points)
-    return dict(p_value=analyser.get_validity(),
-            name=analyser.name,
-            min_y_value=min(y_values),
-            result=analyser.get_result())
+    analysed = context
+    if max_points is not None and context.n > max_points:
+        with tracer.span('downsample', points=context.n, method=downsample):
+            analysed = _reduced_context(context, max_points, downsample)
+    evaluation = get_best_analyser(analysed, tracer).evaluate()
+    return dict(p_value=evaluation.validity,
+            name=evaluation.name,
+            min_y_value=context.min_y,
+            result=evaluation.result)
+
+
+# Fractions of the area at which NormalDistribution samples the x values:
+# the mean, then those used by _estimate_stddev
+_QUANTILES = (.5, .015, .16, .83, .985)
+
+
+def _aligned_linear(x_values, y_values):
+    """
+    LinearDistribution's validity and result for every row of y_values.
+    """
+    count = len(x_values)
+    dx = x_values - np.mean(x_values)
+    mean_y = np.mean(y_values, axis=1)
+    dy = y_values - mean_y[:, None]
+    sxx = np.dot(dx, dx).item()
+    # One least squares solve for every row at once: with x centred, the
+    # normal equations separate, and the gradients are a single product
+    sxy = np.dot(dy, dx)
+    syy = np.einsum('ij,ij->i', dy, dy)
+    if sxx == 0:
+        gradient = np.zeros(len(y_values))
+        residual_variance = syy / count
+    else:
+        gradient = sxy / sxx
+        residual_variance = np.maximum(syy - sxy * sxy / sxx, 0.0) / count
+    constant = mean_y - gradient * np.mean(x_values).item()
+    return 1 - residual_variance, [dict(gradient=g, constant=c)
+            for g, c in zip(gradient.tolist(), constant.tolist())]
+
+
+def _aligned_normal(x_values, y_values, min_y):
+    """
+    NormalDistribution's validity and result for every row of y_values,
+    which must have at least two columns.
+    """
+    area = cumulative_area(x_values, y_values, min_y[:, None])
+    total = area[:, -1]
+    targets = total[:, None] * np.array(_QUANTILES)
+
+    # As quantile_x, for every row and target together
+    right = np.empty(targets.shape, dtype=np.intp)
+    for row, (row_area, row_targets) in enumerate(zip(area, targets)):
+        right[row] = np.searchsorted(row_area, row_targets, side='left')
+    np.maximum(right, 1, out=right)
+    left = right - 1
+    left_x, right_x = x_values[left], x_values[right]
+    left_size = np.take_along_axis(area, left, axis=1)
+    right_size = np.take_along_axis(area, right, axis=1)
+    flat = left_size == right_size
+    with np.errstate(divide='ignore', invalid='ignore'):
+        proportion_across = (targets - left_size) / (right_size - left_size)
+    quantiles = np.where(flat, (right_x + left_x) / 2.,
+            left_x + (right_x - left_x) * proportion_across)
+
+    mean = quantiles[:, 0]
+    stddev = ((mean - quantiles[:, 1]) / 2 +
+              (mean - quantiles[:, 2]) +
+              (quantiles[:, 3] - mean) +
+              (quantiles[:, 4] - mean) / 2) / 4
+
+    spread = stddev != 0
+    scale = np.where(spread, stddev, 1.0) * math.sqrt(2.0)
+    ideal_cumulative = (1.0 + erf((x_values - mean[:, None]) / scale[:, None])) / 2.0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        deviations = np.abs(ideal_cumulative - area / total[:, None])
+    validity = np.where(spread, np.abs(1 - deviations.mean(axis=1)), 0.0)
+    return validity, [dict(mean=m, stdev=s)
+            for m, s in zip(mean.tolist(), stddev.tolist())]
+
+
+def _aligned_random(x_values, y_values):
+    return np.full(len(y_values), 0.1), [dict() for row in y_values]
+
+
+def get_aligned_analyses(x_values, y_values, fixed_interval=False, tracer=None):
+    """
+    Analyse many series which share the same x values, and return the list
+    of dicts get_analysis would give for each of them.
+
+    x_values is a 1D array in increasing order, with at least two points,
+    and y_values a 2D array with one row per series. Rather than building a
+    context and a set of analysers per series, each analyser is evaluated for
+    all the rows at once: the linear fits are one least squares solve, and
+    the running areas and quantiles of the normal analyser work along the
+    rows. The choices and results match get_analysis, to within rounding.
+
+    This covers the analysers in _analysers, so a new analyser must be added
+    here as well. Series are not downsampled.
+    """
+    if tracer is None:
+        tracer = trace.NULL
+    x_values = np.asarray(x_values, dtype='float64')
+    y_values = np.asarray(y_values, dtype='float64')
+    try:
+        if not fixed_interval:
+            with tracer.span('fixed_interval'):
+                _assert_fixed_x_interval(x_values)
+    except ValueError as ex:
+        return [dict(name=UNPROCESSABLE, result=str(ex)) for row in y_values]
+
+    min_y = y_values.min(axis=1)
+    evaluate = {
+        NormalDistribution.name: lambda: _aligned_normal(x_values, y_values, min_y),
+        RandomDistribution.name: lambda: _aligned_random(x_values, y_values),
+        LinearDistribution.name: lambda: _aligned_linear(x_values, y_values),
+    }
+    names = [analyser_type.name for analyser_type in _analysers]
+    validities, results = [], []
+    for name in names:
+        with tracer.span('analyser', analyser=name, series=len(y_values)):
+            validity, result = evaluate[name]()
+        validities.append(validity)
+        results.append(result)
+
+    # As get_best_analyser, ties go to the analyser latest in the list
+    validities = np.stack(validities, axis=1)
+    best = len(names) - 1 - np.argmax(validities[:, ::-1], axis=1)
+    return [dict(p_value=validities[row, choice].item(),
+            name=names[choice],
+            min_y_value=row_min_y,
+            result=results[choice][row])
+        for row, (choice, row_min_y) in enumerate(zip(best.tolist(), min_y.tolist()))]
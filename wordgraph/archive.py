@@ -0,0 +1,152 @@
+# Copyright 2014 Tennessee Leeuwenburg
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+A simple binary file format for series which are described over and over,
+for instance in several languages, so that they need not be parsed each time.
+
+The file starts with a fixed header:
+
+    magic       8 bytes, b'WRDGRAPH'
+    version     uint32
+    count       uint32, the number of series
+    index       uint64, offset of the series index
+    metadata    uint64, offset of the metadata
+    length      uint64, length of the metadata
+
+all little-endian. Next come the columns of each series in turn: its x
+values then its y values, as little-endian float64. The index holds an
+(offset, length) pair of uint64 for each series, giving where its x column
+starts and how many points it has; its y column follows straight after. The
+metadata is UTF-8 JSON holding the series targets, whether each was given
+as integers (see points.Series), and any graph title and axis labels.
+
+Reading memory maps the file, so the series are numpy views onto it which
+are only paged in as the analysers touch them.
+
+    > archive.convert(open('render.json', 'rb'), 'requests.wga', title='requests')
+    > data = archive.load('requests.wga')
+    > for language in ('English', 'es'):
+    >     print(wordgraph.describe(data, source='graphite', language=language))
+'''
+
+import json
+import mmap
+import struct
+
+from . import streaming
+from ._lazy import lazy_import
+from .points import Series
+
+np = lazy_import('numpy')
+
+MAGIC = b'WRDGRAPH'
+VERSION = 1
+
+_HEADER = struct.Struct('<8sIIQQQ')
+_INDEX_ENTRY = struct.Struct('<QQ')
+_COLUMN_DTYPE = '<f8'
+
+
+def _write(path, series, metadata):
+    '''
+    Write (target, points.Series) pairs, one at a time, followed by the
+    index and metadata, then fill in the header.
+    '''
+    targets = []
+    integral = []
+    index = []
+    with open(path, 'wb') as archive_file:
+        archive_file.write(b'\0' * _HEADER.size)
+        offset = _HEADER.size
+        for target, values in series:
+            for column in (values.x, values.y):
+                archive_file.write(np.ascontiguousarray(column, _COLUMN_DTYPE).data)
+            targets.append(target)
+            integral.append(bool(values.integral))
+            index.append(_INDEX_ENTRY.pack(offset, len(values)))
+            offset += 2 * 8 * len(values)
+        index_offset = offset
+        archive_file.write(b''.join(index))
+        encoded = json.dumps(dict(metadata, targets=targets,
+            integral=integral)).encode('utf-8')
+        archive_file.write(encoded)
+        archive_file.seek(0)
+        archive_file.write(_HEADER.pack(MAGIC, VERSION, len(targets), index_offset,
+                index_offset + len(index) * _INDEX_ENTRY.size, len(encoded)))
+
+
+def write(path, graph):
+    '''
+    Save the series of an ingested graph, such as a grapher.GraphiteGraph
+    made with keep_series=True, along with its title and axis labels.
+    '''
+    _write(path, graph.iter_series(), graph.metadata)
+
+
+def convert(source, path, **metadata):
+    '''
+    Save graphite format=json output, as bytes, text or a file object, to an
+    archive at path. It is parsed a chunk at a time, using the streaming
+    module, so only one series is held in memory at once. Keyword arguments
+    such as title are saved as the graph metadata.
+    '''
+    series = ((item['target'], item['datapoints'])
+            for item in streaming.iter_graphite(source))
+    _write(path, series, metadata)
+
+
+def load(path):
+    '''
+    Open an archive, returning its series as a dictionary in the form
+    GraphiteGraph ingests, with the datapoints of each a points.Series
+    viewing the memory-mapped file.
+
+    The arrays are read-only, and the file stays mapped for as long as any
+    of them are in use.
+    '''
+    with open(path, 'rb') as archive_file:
+        try:
+            view = mmap.mmap(archive_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # An empty file cannot be mapped
+            raise ValueError("{0} is not a wordgraph archive".format(path))
+    if len(view) < _HEADER.size:
+        raise ValueError("{0} is not a wordgraph archive".format(path))
+    (magic, version, count, index_offset, metadata_offset,
+            metadata_length) = _HEADER.unpack_from(view, 0)
+    if magic != MAGIC:
+        raise ValueError("{0} is not a wordgraph archive".format(path))
+    if version != VERSION:
+        raise ValueError("{0} has unsupported archive version {1}".format(path, version))
+    if (index_offset + count * _INDEX_ENTRY.size > metadata_offset
+            or metadata_offset + metadata_length > len(view)):
+        raise ValueError("{0} is truncated".format(path))
+
+    metadata = json.loads(view[metadata_offset:metadata_offset + metadata_length]
+            .decode('utf-8'))
+    targets = metadata.pop('targets')
+    integral = metadata.pop('integral', [False] * len(targets))
+    graphite_data = []
+    for number, (target, integers) in enumerate(zip(targets, integral)):
+        offset, length = _INDEX_ENTRY.unpack_from(view,
+                index_offset + number * _INDEX_ENTRY.size)
+        columns = np.frombuffer(view, _COLUMN_DTYPE, 2 * length, offset)
+        graphite_data.append({
+            'target': target,
+            'datapoints': Series(columns[:length], columns[length:],
+                integral=integers),
+        })
+    metadata['graphite_data'] = graphite_data
+    return metadata
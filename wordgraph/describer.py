@@ -12,40 +12,145 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import functools
+import hashlib
+import json
+import marshal
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict, deque, namedtuple
+
 from . import grapher
 from . import analysers
+from . import points
 from . import realiser
+from . import trace
+from ._lazy import lazy_import
+
+asyncio = lazy_import('asyncio')
+futures = lazy_import('concurrent.futures')
 
 GRAPH_TYPES = {
     'graphite': grapher.GraphiteGraph,
+    'graphite-json': grapher.GraphiteJSONGraph,
+    'graphite-compact': grapher.GraphiteCompactGraph,
+    'whisper': grapher.WhisperGraph,
+    'archive': grapher.ArchiveGraph,
 }
 
 class Describer():
-    def __init__(self, source=None, language='English', demographic='summary'):
+    def __init__(self, source=None, language='English', demographic='summary',
+            max_points=None, downsample='lttb', cache=None, tracer=None,
+            retain_data=True, threads=None, batch=False, executor=None,
+            max_concurrency=None, memory=False):
         '''
         utility class for holding nondefault variables
         >>> spanish_for_the_masses = Describer('graphite', 'es', 'summary')
         >>> spanish_for_the_masses.description(data)
+
+        See describe for max_points, downsample, cache, tracer, retain_data,
+        threads and batch. executor and max_concurrency only apply to
+        description_async.
+
+        With memory=True, description() measures the memory allocated while
+        describing, and returns a MeasuredDescription of the text and a
+        summary of the memory used; see trace.MemoryCollector. It cannot be
+        combined with threads, as the stages would overlap.
         '''
         self.source = source
         self.language = language
         self.demographic = demographic
+        self.max_points = max_points
+        self.downsample = downsample
+        self.cache = cache
+        self.tracer = tracer
+        self.retain_data = retain_data
+        self.threads = threads
+        self.batch = batch
+        self._memory = memory
+        self._executor = executor
+        self._max_concurrency = max_concurrency
+        self._semaphore = None
 
-    def description(self, data, **kwargs):
-        args = self.__dict__.copy()
+    def _args(self, kwargs):
+        args = dict((key, value) for key, value in self.__dict__.items()
+                if not key.startswith('_'))
         args.update(kwargs)
+        return args
+
+    def description(self, data, **kwargs):
+        args = self._args(kwargs)
 
+        if self._memory:
+            return _describe_measured(data, args)
         return describe(data, **args)
 
-def describe(data, source=None, language='English', demographic='summary'):
+    def descriptions(self, data_items, **kwargs):
+        '''
+        Describe many graphs at once; see describe_many.
+        '''
+        args = self._args(kwargs)
+
+        return describe_many(data_items, **args)
+
+    async def description_async(self, data, **kwargs):
+        '''
+        Awaitable version of description, for use from asyncio code; see
+        describe_async. At most max_concurrency descriptions from this
+        Describer run at once, and the rest wait their turn.
+        '''
+        args = self._args(kwargs)
+        args.setdefault('executor', self._executor)
+
+        if self._max_concurrency is None:
+            return await describe_async(data, **args)
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        async with self._semaphore:
+            return await describe_async(data, **args)
+
+def describe(data, source=None, language='English', demographic='summary',
+        max_points=None, downsample='lttb', cache=None, tracer=None, retain_data=True,
+        threads=None, batch=False):
     '''
     Describe the supplied graph object, together with a hint about the source of that object.
 
+    To bound the cost of analysing very long series, give max_points. Each
+    series is then reduced to about that many points before analysis, using
+    a shape-preserving downsample method ('lttb' or 'min-max'). The ranges
+    and start and end values described are still those of the full series.
+
+    If a DescriptionCache is given as cache, identical data described with
+    identical options is only analysed once while the entry lasts.
+
+    To find where the time goes, give a trace.Tracer such as a
+    trace.Collector as tracer. Each stage of the description is then timed
+    as a span, along with the validity of each analyser.
+
+    With retain_data=False, the graph lets go of the data and each series as
+    soon as it is finished with them, which lowers the peak memory used when
+    the data is read as it goes, as with the 'graphite-json' source.
+
+    Give threads to analyse the series of a graph concurrently on a pool of
+    that many threads, for graphs with many long series. For graphs of many
+    series over the same times, batch=True analyses those series together in
+    one pass over a 2D array instead.
+
     @return: None if there was no description text generated for the graph
     @return: 
 
     Supported sources include:
       -- Raw data (graphite-style)
+      -- Unparsed graphite JSON output, as bytes, text or a file object
+         (source='graphite-json')
+      -- Graphite start/end/step series, as from its pickle and msgpack
+         formats (source='graphite-compact')
+      -- Whisper files, or directories of them (source='whisper')
+      -- Files saved with the archive module (source='archive')
+      -- Graph objects which have already ingested their data, such as a
+         grapher.LiveGraphiteGraph (source is ignored)
 
     Unsupported sources include:
       -- graphite full integration 
@@ -54,14 +159,387 @@ def describe(data, source=None, language='English', demographic='summary'):
       -- json, text?
     '''
 
-    # If the source is a recognised type, then use a specialist graph type
-    if source in GRAPH_TYPES:
-        graph = GRAPH_TYPES[source]()
+    if tracer is None:
+        tracer = trace.NULL
+    with tracer.span('describe', source=source) as span:
+        if cache is not None:
+            key = _cache_key(cache, data, source, language, demographic, max_points, downsample)
+            text = cache.get(key)
+            span.set(cache=text is not None)
+            if text is not None:
+                return text
+
+        graph = _ingest(data, source, max_points=max_points, downsample=downsample,
+                tracer=tracer, retain_data=retain_data, threads=threads, batch=batch)
+        text = _realise(graph, tracer)
+
+        if cache is not None:
+            cache.put(key, text)
+        return text
 
+
+def _ingest(data, source, tracer=None, retain_data=True, threads=None, batch=False,
+        **graph_options):
+    # Only passed on when needed, so graph types need not all support them
+    if not retain_data:
+        graph_options['retain_data'] = False
+    if threads is not None:
+        graph_options['threads'] = threads
+    if batch:
+        graph_options['batch'] = True
+    if tracer is None:
+        tracer = trace.NULL
     else:
-        graph = grapher.generic()
+        graph_options['tracer'] = tracer
+
+    with tracer.span('ingest', source=source):
+        # A graph which has already ingested its data, such as a LiveGraphiteGraph
+        if isinstance(data, grapher.Graph):
+            return data
+
+        # If the source is a recognised type, then use a specialist graph type
+        if source in GRAPH_TYPES:
+            graph = GRAPH_TYPES[source](**graph_options)
 
-    graph.auto_ingest(data)
-    text = realiser.english(graph.as_dict()) # , title, x_name, y_name) TODO: how to handle meta
+        else:
+            graph = grapher.generic()
 
+        graph.auto_ingest(data)
+        return graph
+
+
+def _realise(graph, tracer=None):
+    if tracer is None:
+        tracer = trace.NULL
+    with tracer.span('realise'):
+        structure = graph.as_dict()
+        with tracer.span('render'):
+            return realiser.english(structure) # , title, x_name, y_name) TODO: how to handle meta
+
+
+async def describe_async(data, source=None, language='English', demographic='summary',
+        max_points=None, downsample='lttb', cache=None, tracer=None, retain_data=True,
+        threads=None, batch=False, executor=None):
+    '''
+    Awaitable version of describe, which keeps the event loop free while the
+    graph is analysed and rendered.
+
+    Ingestion and analysis run as one job on the executor, and the realiser
+    as a second; executor=None uses the event loop's default executor. A
+    process pool keeps the work entirely off the loop's interpreter.
+
+    Cancelling the awaiting task raises CancelledError straight away and
+    stops the description from reaching its next stage. A job the executor
+    has already started will run to completion in the background.
+
+    The cache, if any, is consulted and filled on the event loop itself.
+    Spans of a tracer are only collected from a thread pool executor, not a
+    process pool.
+    '''
+    if cache is not None:
+        key = _cache_key(cache, data, source, language, demographic, max_points, downsample)
+        text = cache.get(key)
+        if text is not None:
+            return text
+
+    loop = asyncio.get_running_loop()
+    graph = await loop.run_in_executor(executor,
+            functools.partial(_ingest, data, source,
+                max_points=max_points, downsample=downsample, tracer=tracer,
+                retain_data=retain_data, threads=threads, batch=batch))
+    text = await loop.run_in_executor(executor,
+            functools.partial(_realise, graph, tracer))
+
+    if cache is not None:
+        cache.put(key, text)
     return text
+
+
+class MeasuredDescription(namedtuple('BaseMeasuredDescription', ['text', 'memory'])):
+    """
+    The outcome of Describer.description in memory accounting mode: the text,
+    and the summary from trace.MemoryCollector.memory() of the memory used.
+    """
+
+
+def _describe_measured(data, options):
+    if options.get('tracer') is not None:
+        raise ValueError("Memory accounting uses its own tracer")
+    if (options.get('threads') or 1) > 1:
+        raise ValueError("Memory accounting cannot attribute memory to stages "
+                "on several threads; use threads=None")
+    options = dict(options, tracer=trace.MemoryCollector())
+    text = describe(data, **options)
+    return MeasuredDescription(text, options['tracer'].memory())
+
+
+# Sources whose data names files which may change, so cannot be cached
+_UNCACHEABLE_SOURCES = ('whisper', 'archive')
+
+
+def _cache_key(cache, data, source=None, language='English', demographic='summary',
+        max_points=None, downsample='lttb', tracer=None, retain_data=True,
+        threads=None, batch=False):
+    if source in _UNCACHEABLE_SOURCES:
+        return None
+    return cache.key(data, source, language, demographic, max_points, downsample)
+
+
+class _Uncacheable(Exception):
+    pass
+
+
+def _json_default(value):
+    '''
+    Stand-ins for the array and bytes values json cannot encode, when
+    fingerprinting data for the cache.
+    '''
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {'bytes': hashlib.blake2b(value, digest_size=16).hexdigest()}
+    if isinstance(value, points.Series):
+        return {'series': [_json_default(value.x), _json_default(value.y)]}
+    if hasattr(value, 'tobytes') and hasattr(value, 'dtype'):
+        # numpy arrays and scalars
+        return {'array': [str(value.dtype), list(value.shape),
+            _json_default(value.tobytes())]}
+    raise _Uncacheable(type(value).__name__)
+
+
+# Keys of graphite data holding long lists of numbers
+_NUMERIC_KEYS = ('datapoints', 'values')
+
+
+def _packed(value):
+    '''
+    Copy data for fingerprinting, with each list of graphite datapoints or
+    values replaced by a hash of its marshalled bytes, which is much faster
+    than encoding it number by number as JSON.
+    '''
+    if isinstance(value, dict):
+        packed = {}
+        for key, item in value.items():
+            if key in _NUMERIC_KEYS and isinstance(item, list):
+                try:
+                    # Version 2 has no back references, so equal lists
+                    # marshal the same whichever objects they share
+                    item = {'marshal': _json_default(marshal.dumps(item, 2))}
+                except ValueError:
+                    pass
+            packed[key] = _packed(item)
+        return packed
+    if isinstance(value, list) and value and isinstance(value[0], dict):
+        return [_packed(item) for item in value]
+    return value
+
+
+class DescriptionCache(object):
+    '''
+    A cache of description text, shared between describe calls.
+
+    Entries are keyed on a hash of the input data together with the options
+    used to describe it, so byte-identical requests hit the same entry
+    regardless of where they came from. Datapoints are hashed as marshalled
+    bytes, so finding the key costs a small fraction of a description. The
+    least recently used entries are evicted once there are more than maxsize
+    of them or their text adds up to more than max_bytes, and entries expire
+    ttl seconds after they were stored (ttl=None keeps them until evicted).
+
+    hits and misses count lookups. Data which cannot be fingerprinted, such
+    as an already-ingested Graph or an open file, is never cached, and nor
+    are paths to Whisper or archive files. The cache is safe to share
+    between threads.
+    '''
+
+    def __init__(self, maxsize=1024, ttl=300, max_bytes=None, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def key(self, data, *options):
+        '''
+        Return the cache key for data described with the given options, or
+        None if the data cannot be fingerprinted.
+        '''
+        try:
+            encoded = json.dumps([_packed(data), options], sort_keys=True,
+                    separators=(',', ':'), default=_json_default)
+        except (_Uncacheable, TypeError, ValueError):
+            return None
+        return hashlib.blake2b(encoded.encode('utf-8'), digest_size=20).hexdigest()
+
+    def get(self, key):
+        '''
+        Return the cached text for key, or None.
+        '''
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None \
+                    and self._clock() - entry[0] > self.ttl:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, text):
+        if key is None or text is None:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (self._clock(), text)
+            self._size += len(text)
+            while self._entries and (len(self._entries) > self.maxsize or
+                    (self.max_bytes is not None and self._size > self.max_bytes)):
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        stored, text = self._entries.pop(key)
+        self._size -= len(text)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+class Description(namedtuple('BaseDescription', ['index', 'text', 'error'])):
+    """
+    The outcome of describing one graph with describe_many. The index is the
+    graph's position in the input. If describing it failed, text is None and
+    error holds the exception.
+    """
+
+
+def _picklable(ex):
+    try:
+        pickle.dumps(ex)
+    except Exception:
+        return RuntimeError(repr(ex))
+    return ex
+
+
+def _describe_chunk(chunk, options):
+    descriptions = []
+    for index, data, text in chunk:
+        if text is not None:
+            # Already found in the cache
+            descriptions.append(Description(index, text, None))
+            continue
+        try:
+            descriptions.append(Description(index, describe(data, **options), None))
+        except Exception as ex:
+            descriptions.append(Description(index, None, _picklable(ex)))
+    return descriptions
+
+
+def _chunked(items, chunksize):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == chunksize:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def describe_many(data_items, workers=None, chunksize=8, ordered=True, **options):
+    '''
+    Describe each graph in data_items, spreading the work over a pool of
+    worker processes. Other keyword options are passed on to describe.
+
+    Yields a Description for every graph. With ordered=True (the default)
+    they come out in input order; otherwise each is yielded as soon as its
+    chunk is finished. A graph which cannot be described does not stop the
+    others; its Description carries the exception instead.
+
+    Graphs are sent to the workers chunksize at a time, and at most two
+    chunks per worker are in flight, so data_items may be a lazy iterable.
+    workers defaults to the number of CPUs; with workers=1 everything runs
+    in the calling process.
+
+    A cache given in the options is looked up and filled in the calling
+    process, and graphs found in it are not sent to the workers. A tracer
+    can only be given with workers=1.
+    '''
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers > 1 and options.get('tracer') is not None:
+        raise ValueError("A tracer cannot collect spans from worker processes; "
+                "use workers=1")
+
+    if workers <= 1:
+        items = ((index, data, None) for index, data in enumerate(data_items))
+        for chunk in _chunked(items, chunksize):
+            for description in _describe_chunk(chunk, options):
+                yield description
+        return
+
+    cache = options.pop('cache', None)
+    keys = {}
+    items = _check_cache(data_items, cache, keys, options)
+    with futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in _chunked(items, chunksize):
+            pending.append(pool.submit(_describe_chunk, chunk, options))
+            while len(pending) >= 2 * workers:
+                for description in _fill_cache(_next_done(pending, ordered), cache, keys):
+                    yield description
+        while pending:
+            for description in _fill_cache(_next_done(pending, ordered), cache, keys):
+                yield description
+
+
+def _check_cache(data_items, cache, keys, options):
+    '''
+    Yield (index, data, text) for each graph, with the text filled in (and
+    the data dropped) for graphs found in the cache. The keys of the graphs
+    which were not found are left in keys.
+    '''
+    for index, data in enumerate(data_items):
+        if cache is None:
+            yield index, data, None
+            continue
+        key = _cache_key(cache, data, **options)
+        text = cache.get(key)
+        if text is not None:
+            yield index, None, text
+        else:
+            keys[index] = key
+            yield index, data, None
+
+
+def _fill_cache(descriptions, cache, keys):
+    for description in descriptions:
+        key = keys.pop(description.index, None)
+        if cache is not None and description.error is None:
+            cache.put(key, description.text)
+    return descriptions
+
+
+def _next_done(pending, ordered):
+    '''
+    Remove a finished future from pending and return its results; the oldest
+    one if ordered, otherwise whichever finishes first.
+    '''
+    if ordered:
+        return pending.popleft().result()
+    done, _ = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+    finished = done.pop()
+    pending.remove(finished)
+    return finished.result()
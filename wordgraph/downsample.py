@@ -0,0 +1,146 @@
+# Copyright 2014 Tennessee Leeuwenburg
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+Shape-preserving reduction of long series, used to bound the cost of
+analysis for series with far more points than a one-sentence description
+needs.
+
+Each method takes a points.Series sorted by x and a target number of points,
+and returns a new, shorter Series. Whatever the method, the first and last
+points and the points holding the minimum and maximum y values are always
+kept, so the reduced series still spans the same range as the original.
+
+The methods are registered by name in METHODS; use reduce() to pick one.
+'''
+
+from ._lazy import lazy_import
+from .points import Series
+
+np = lazy_import('numpy')
+
+
+def _select(series, indices):
+    '''
+    Return the points at the given indices, plus the first, last, minimum
+    and maximum points, in x order.
+    '''
+    y = series.y
+    keep = np.concatenate([indices,
+        [0, len(y) - 1, np.argmin(y), np.argmax(y)]])
+    keep = np.unique(keep)
+    return Series(series.x[keep], y[keep], dtype=series.dtype)
+
+
+def _buckets(values, buckets, origin=0):
+    '''
+    Divide the values between the first and last into at most the given
+    number of buckets, all of one width but the last, measuring them from
+    origin. Returns that width and the buckets as the rows of an array, with
+    the last row padded by repeating its last value (which never wins a tie,
+    as argmin and argmax take the first).
+    '''
+    inner = len(values) - 2
+    width = -(-inner // buckets)
+    rows = -(-inner // width)
+    padded = np.empty(rows * width)
+    np.subtract(values[1:-1], origin, out=padded[:inner])
+    padded[inner:] = padded[inner - 1]
+    return width, padded.reshape(rows, width)
+
+
+def lttb(series, max_points):
+    '''
+    Largest-triangle-three-buckets decimation (Steinarsson, 2013).
+
+    The points between the first and last are divided into at most
+    max_points - 2 buckets. From each bucket, the point forming the largest
+    triangle with the point chosen from the previous bucket and the average
+    of the next bucket is kept.
+
+    Choosing each bucket's point after the one before costs a Python loop
+    over the buckets, so instead all buckets are chosen at once, measuring
+    each triangle from the average of the previous bucket rather than from
+    the point chosen there.
+    '''
+    x, y = series.x, series.y
+    count = len(x)
+    buckets = max_points - 2
+    if count <= max_points:
+        return series
+    if buckets < 1:
+        return _select(series, np.arange(0))
+
+    # x is measured from the first point, to keep the precision of timestamps
+    origin = x[0]
+    width, bucket_x = _buckets(x, buckets, origin)
+    bucket_y = _buckets(y, buckets)[1]
+    starts = 1 + width * np.arange(len(bucket_y))
+    average_x, average_y = bucket_x.mean(axis=1), bucket_y.mean(axis=1)
+    average_x[-1] = x[starts[-1]:-1].mean() - origin
+    average_y[-1] = y[starts[-1]:-1].mean()
+    # The averages of the previous and next buckets, with the first and last
+    # points standing in at either end
+    previous_x, previous_y = np.append(0, average_x[:-1]), np.append(y[0], average_y[:-1])
+    next_x, next_y = np.append(average_x[1:], x[-1] - origin), np.append(average_y[1:], y[-1])
+
+    # Twice the triangle area is |across * (y - previous y) + up * (x - previous x)|,
+    # worked in place in the bucket arrays
+    across, up = previous_x - next_x, next_y - previous_y
+    area = np.multiply(bucket_x, up[:, None], out=bucket_x)
+    area += np.multiply(bucket_y, across[:, None], out=bucket_y)
+    area -= (across * previous_y + up * previous_x)[:, None]
+    chosen = starts + np.abs(area, out=area).argmax(axis=1)
+    return _select(series, chosen)
+
+
+def min_max(series, max_points):
+    '''
+    Min/max bucketing.
+
+    The points between the first and last are divided into at most
+    (max_points - 2) / 2 buckets, and the lowest and highest point of each
+    bucket are kept.
+    '''
+    count = len(series)
+    buckets = (max_points - 2) // 2
+    if count <= max_points:
+        return series
+    if buckets < 1:
+        return _select(series, np.arange(0))
+
+    width, bucket_y = _buckets(series.y, buckets)
+    starts = 1 + width * np.arange(len(bucket_y))
+    return _select(series, np.concatenate([starts + bucket_y.argmin(axis=1),
+        starts + bucket_y.argmax(axis=1)]))
+
+
+METHODS = {
+    'lttb': lttb,
+    'min-max': min_max,
+}
+
+
+def reduce(series, max_points, method='lttb'):
+    '''
+    Reduce a series sorted by x to roughly max_points points using the named
+    method. Because the extreme points are always kept, the result may have
+    up to two points more than max_points. Series which are already short
+    enough are returned unchanged.
+    '''
+    if method not in METHODS:
+        raise ValueError("Unknown downsampling method {0!r}".format(method))
+    if max_points is None or len(series) <= max_points:
+        return series
+    return METHODS[method](series, max_points)
@@ -0,0 +1,199 @@
+# Copyright 2014 Tennessee Leeuwenburg
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+A client for graphite's render API, which fetches series ready to describe.
+
+Connections to graphite are pooled and kept alive between requests, and
+several targets are fetched at once over the pool. The maxDataPoints and
+consolidateBy options are passed on to graphite, so that it consolidates long
+series itself rather than sending more points than will be analysed. The
+response is parsed as it arrives with the streaming module.
+
+    > with fetch.GraphiteClient('http://graphite.example.com') as client:
+    >     graph = client.graph(['servers.*.requests'], from_time='-1d',
+    >             title='requests', max_points=500)
+    > text = wordgraph.describe(graph)
+'''
+
+import http.client
+import queue
+import threading
+from urllib.parse import urlencode, urlsplit
+
+from . import grapher
+from . import streaming
+from ._lazy import lazy_import
+
+futures = lazy_import('concurrent.futures')
+
+CONSOLIDATION_FUNCTIONS = ('average', 'median', 'sum', 'min', 'max', 'first', 'last')
+
+# Errors meaning a kept-alive connection was closed by the server while idle
+_STALE_CONNECTION = (http.client.RemoteDisconnected, http.client.CannotSendRequest,
+        ConnectionResetError, BrokenPipeError)
+
+
+class FetchError(IOError):
+    '''
+    Raised when graphite does not return the requested series. status is
+    the HTTP status, or None if no response was received.
+    '''
+
+    def __init__(self, message, status=None):
+        IOError.__init__(self, message)
+        self.status = status
+
+
+class GraphiteClient(object):
+    '''
+    Fetches series from the graphite server at base_url, using at most
+    pool_size connections at once. timeout (in seconds) applies to each
+    connection attempt and read; headers are sent with every request.
+    '''
+
+    def __init__(self, base_url, pool_size=4, timeout=30, headers=None):
+        url = urlsplit(base_url)
+        if url.scheme == 'https':
+            self._connection_type = http.client.HTTPSConnection
+        elif url.scheme == 'http':
+            self._connection_type = http.client.HTTPConnection
+        else:
+            raise ValueError("Unsupported graphite URL {0!r}".format(base_url))
+        self.host = url.hostname
+        self.port = url.port
+        self.render_path = url.path.rstrip('/') + '/render'
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.headers = dict(headers or {})
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        '''
+        Close the idle connections. The client can still be used afterwards.
+        '''
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def _acquire(self):
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._connection_type(self.host, self.port, timeout=self.timeout)
+
+    def _release(self, connection, reuse):
+        if reuse:
+            self._idle.put(connection)
+        else:
+            connection.close()
+        self._slots.release()
+
+    def render_url(self, targets, from_time='-1h', until_time='now',
+            max_data_points=None, consolidate_by=None):
+        '''
+        The path and query of a format=json render request for targets.
+        '''
+        if consolidate_by is not None:
+            if consolidate_by not in CONSOLIDATION_FUNCTIONS:
+                raise ValueError("Unknown consolidation function {0!r}".format(consolidate_by))
+            targets = ["consolidateBy({0},'{1}')".format(target, consolidate_by)
+                    for target in targets]
+        query = [('target', target) for target in targets]
+        query += [('from', from_time), ('until', until_time), ('format', 'json')]
+        if max_data_points is not None:
+            query.append(('maxDataPoints', int(max_data_points)))
+        return '{0}?{1}'.format(self.render_path, urlencode(query))
+
+    def render(self, targets, from_time='-1h', until_time='now',
+            max_data_points=None, consolidate_by=None):
+        '''
+        Fetch targets in one render request, returning the series in
+        graphite's form, with the datapoints of each a points.Series.
+
+        If max_data_points is given, graphite consolidates each series
+        down to at most that many points, with the consolidate_by function
+        ('average' unless given) if set.
+        '''
+        path = self.render_url(targets, from_time, until_time,
+                max_data_points, consolidate_by)
+        for attempt in range(2):
+            connection = self._acquire()
+            reuse = False
+            try:
+                connection.request('GET', path, headers=self.headers)
+                response = connection.getresponse()
+                if response.status != 200:
+                    message = response.read(200).decode('utf-8', 'replace')
+                    raise FetchError("Graphite returned {0} {1}: {2}".format(
+                        response.status, response.reason, message), response.status)
+                series = streaming.load_graphite(response)
+                response.read()
+                reuse = not response.will_close
+                return series
+            except _STALE_CONNECTION:
+                # Retry once, on a fresh connection, if the server had
+                # closed this one while it sat in the pool
+                if attempt:
+                    raise FetchError("Graphite closed the connection")
+            except (OSError, http.client.HTTPException) as ex:
+                if isinstance(ex, FetchError):
+                    raise
+                raise FetchError("Could not fetch from graphite: {0}".format(ex))
+            finally:
+                self._release(connection, reuse)
+
+    def fetch(self, targets, from_time='-1h', until_time='now',
+            max_data_points=None, consolidate_by=None):
+        '''
+        Fetch each target with its own request, several at once over the
+        connection pool. The series are returned in the order of targets,
+        and of graphite's response for each.
+        '''
+        targets = list(targets)
+        if len(targets) <= 1 or self.pool_size == 1:
+            return self.render(targets, from_time, until_time,
+                    max_data_points, consolidate_by)
+        options = (from_time, until_time, max_data_points, consolidate_by)
+        workers = min(self.pool_size, len(targets))
+        with futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(lambda target: self.render([target], *options),
+                    targets))
+        return [series for result in results for series in result]
+
+    def graph(self, targets, from_time='-1h', until_time='now', title=None,
+            max_points=None, downsample='lttb', consolidate_by=None, **metadata):
+        '''
+        Fetch targets and ingest them into a grapher.GraphiteGraph, ready to
+        describe. Graphite is asked for at most max_points points per series,
+        so no series needs downsampling here. Other keyword arguments, such
+        as y_axis, are passed on as graph metadata.
+        '''
+        data = dict(metadata, graphite_data=self.fetch(targets, from_time, until_time,
+                max_points, consolidate_by))
+        if title is not None:
+            data['title'] = title
+        graph = grapher.GraphiteGraph(max_points=max_points, downsample=downsample)
+        graph.auto_ingest(data)
+        return graph
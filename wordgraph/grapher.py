@@ -22,7 +22,11 @@ abstract, and defines the interface for automated data ingestion.
 
 AutoGraph is extended by GraphiteGraph, which does something. This Graph class makes
 various non-general assupmtions about the incoming data, consistent with the data
-being generated by the "graphite" web graphing application. 
+being generated by the "graphite" web graphing application. LiveGraphiteGraph
+extends it for live feeds, where new datapoints keep arriving for each series,
+GraphiteJSONGraph for graphite's raw, unparsed JSON output,
+GraphiteCompactGraph for its start/end/step series, WhisperGraph for its
+on-disk Whisper files, and ArchiveGraph for series saved by the archive module.
 
 Useful extensions to this module would include a broader selection of specific graph
 types, supporting a wider array of input data use cases.
@@ -30,12 +34,38 @@ types, supporting a wider array of input data use cases.
 '''
 
 
+import copy
+import os
 import sys
+from collections import OrderedDict, deque
 from time import gmtime
 from time import strftime
 
 from . import analysers
+from . import archive
 from . import points
+from . import streaming
+from . import trace
+from . import whisper
+from ._lazy import lazy_import
+
+np = lazy_import('numpy')
+futures = lazy_import('concurrent.futures')
+
+
+def _number(value, integral):
+    '''
+    A value from a series as a Python number for the descriptor dictionary:
+    an int if the series was given integers (see points.Series), so that it
+    reads as it did in the input, and otherwise a float. Zero is always the
+    int 0, as graphite's null values and any zero value have always been
+    plotted as 0.
+    '''
+    value = float(value)
+    if value == 0 or integral and value.is_integer():
+        return int(value)
+    return value
+
 
 def generic():
 
@@ -91,7 +121,44 @@ class GraphiteGraph(AutoGraph):
 
     """Graphite is timeseries, so we know that the x-axis will always be time."""
 
-    def __init__(self):
+    # Whether every series is known to be evenly spaced, so need not be checked
+    fixed_interval = False
+
+    def __init__(self, max_points=None, downsample='lttb', tracer=None,
+            retain_data=True, threads=None, batch=False, keep_series=False):
+        '''
+        If max_points is given, each series is reduced to about that many
+        points before analysis, using the named method from the downsample
+        module. The axis ranges and start and end values still come from the
+        full series.
+
+        If a trace.Tracer is given, each series and the stages of its analysis
+        are timed as spans.
+
+        With retain_data=False the graph keeps no reference to the raw data,
+        so it can be freed as ingestion goes. The points of each series are
+        only kept once analysed with keep_series=True, for iter_series(), as
+        archive.write needs.
+
+        If threads is given, series are read and analysed concurrently on a
+        pool of that many threads. The analysers spend most of their time in
+        numpy, which releases the GIL, so graphs of many long series can use
+        several cores. Results are still added to the graph in input order.
+
+        With batch=True, series which share the same x values, as the series
+        graphite returns for one request usually do, are analysed together
+        as the rows of one array; see analysers.get_aligned_analyses. This
+        removes most of the cost per series for graphs of many series, but
+        every series is read before any is analysed. Series which would be
+        downsampled, or which line up with no other, are analysed alone.
+        '''
+        self.max_points = max_points
+        self.downsample = downsample
+        self.tracer = trace.NULL if tracer is None else tracer
+        self.retain_data = retain_data
+        self.keep_series = keep_series
+        self.threads = threads
+        self.batch = batch
 
         self.defaults = {
             'title': None,
@@ -116,12 +183,103 @@ class GraphiteGraph(AutoGraph):
         Creates the response for as_dist ad self.result
         '''
 
-        self.raw_data = raw_data
-        self.result_dict = self.defaults.copy()
+        self.raw_data = raw_data if self.retain_data else None
+        self.result_dict = copy.deepcopy(self.defaults)
+        self.metadata = self._metadata(raw_data)
+        self.series_values = []
+
+        for name, values, analysis in self._analysed(raw_data['graphite_data']):
+            self._ingest_series(name, values, analysis)
+            if self.result_dict.get('name') == analysers.UNPROCESSABLE:
+                break
+
+        self._apply_metadata(raw_data)
+
+    def _analysed(self, series_list):
+        '''
+        Yield _create_series(series) for each series in turn, computing them
+        on the thread pool if there is one. At most two series per thread are
+        in hand at once, so series_list may be read as it goes.
+        '''
+        if self.batch:
+            yield from self._analysed_together(series_list)
+            return
+
+        if not self.threads or self.threads <= 1:
+            for series in series_list:
+                yield self._create_series(series)
+            return
+
+        with futures.ThreadPoolExecutor(max_workers=self.threads) as pool:
+            pending = deque()
+            try:
+                for series in series_list:
+                    pending.append(pool.submit(self._create_series, series))
+                    if len(pending) >= 2 * self.threads:
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+            finally:
+                for job in pending:
+                    job.cancel()
+
+    def _analysed_together(self, series_list):
+        '''
+        Yield (name, values, analysis) for each series in turn, analysing
+        those with the same x values in one batch.
+        '''
+        read = [self._read_series(series) for series in series_list]
+        analyses = [None] * len(read)
+        for indices in self._aligned_groups(read):
+            x_values = read[indices[0]][1].x
+            y_values = np.stack([read[index][1].y for index in indices])
+            with self.tracer.span('batch', series=len(indices), points=len(x_values)):
+                batch = analysers.get_aligned_analyses(x_values, y_values,
+                        self.fixed_interval, self.tracer)
+            for index, analysis in zip(indices, batch):
+                analyses[index] = analysis
+
+        for (name, values), analysis in zip(read, analyses):
+            if analysis is None:
+                yield self._analyse_series(name, values)
+            else:
+                yield name, values, analysis
+
+    def _aligned_groups(self, read):
+        '''
+        Group the indices of the series in read which can be analysed in a
+        batch by their x values, dropping any group of one.
+        '''
+        groups = []
+        for index, (name, values) in enumerate(read):
+            count = len(values)
+            if count < 2 or (self.max_points is not None and count > self.max_points):
+                continue
+            if not (np.diff(values.x) > 0).all() or not np.isfinite(values.y).all():
+                continue
+            for x_values, indices in groups:
+                if len(x_values) == count and np.array_equal(x_values, values.x):
+                    indices.append(index)
+                    break
+            else:
+                groups.append((values.x, [index]))
+        return [indices for x_values, indices in groups if len(indices) > 1]
+
+    def _metadata(self, raw_data):
+        return dict((key, raw_data[key])
+                for key in ('title', 'x_axis', 'y_axis') if key in raw_data)
 
-        for series in self.raw_data['graphite_data']:
-            self._create_series(series)
+    def iter_series(self):
+        '''
+        Yield (target, points.Series) for each series ingested, for instance
+        to save them with the archive module. The graph must have been made
+        with keep_series=True.
+        '''
+        if not self.keep_series:
+            raise ValueError("The series of a graph are only kept with keep_series=True")
+        return iter(self.series_values)
 
+    def _apply_metadata(self, raw_data):
         # set values from raw data keys
         for key in ('title',):
             if key in raw_data:
@@ -132,14 +290,18 @@ class GraphiteGraph(AutoGraph):
                 self.result_dict[key].update(raw_data[key])
 
     def as_dict(self):
-
-        readable_dict = self.result_dict.copy()
+        '''
+        Return a copy of the result dictionary with readable dates. The graph
+        itself is unchanged, so it can be described again.
+        '''
+        readable_dict = copy.deepcopy(self.result_dict)
         if readable_dict.get('name', None) != analysers.UNPROCESSABLE:
-            readable_dict['x_axis']['max'] = self._to_readable_date(readable_dict['x_axis']['max'])
-            readable_dict['x_axis']['min'] = self._to_readable_date(readable_dict['x_axis']['min'])
-            for item in readable_dict['series']:
-                item['start_value']['x'] = self._to_readable_date(item['start_value']['x'])
-                item['end_value']['x'] = self._to_readable_date(item['end_value']['x'])
+            with self.tracer.span('format_dates'):
+                readable_dict['x_axis']['max'] = self._to_readable_date(readable_dict['x_axis']['max'])
+                readable_dict['x_axis']['min'] = self._to_readable_date(readable_dict['x_axis']['min'])
+                for item in readable_dict['series']:
+                    item['start_value']['x'] = self._to_readable_date(item['start_value']['x'])
+                    item['end_value']['x'] = self._to_readable_date(item['end_value']['x'])
         return readable_dict
 
     def _to_readable_date(self, datestring):
@@ -148,14 +310,39 @@ class GraphiteGraph(AutoGraph):
 
     def _create_series(self, series):
         '''
-        Iterate over the data series contained in the raw data and add these 
-        to the graph descriptor dictionary.
+        Read and analyse one data series from the raw data, returning
+        (name, values, analysis). This may run on a worker thread, so must
+        not change the graph.
+        '''
+        return self._analyse_series(*self._read_series(series))
+
+    def _read_series(self, series):
+        '''
+        Read one data series from the raw data, returning (name, values).
         '''
+        return series['target'], self._convert_points(series['datapoints'])
 
-        values = self._convert_points(series['datapoints'])
+    def _analyse_series(self, name, values):
+        with self.tracer.span('series', target=name, points=len(values)):
+            return name, values, self._analyse(values)
+
+    def _ingest_series(self, name, values, analysis):
+        '''
+        Add an analysed series to the graph descriptor dictionary.
+        '''
+        if self.keep_series:
+            self.series_values.append((name, values))
         self._update_extremes(values)
-        analysis = analysers.get_analysis(values)
+        self._add_series(name, values, analysis)
 
+    def _analyse(self, values):
+        return analysers.get_analysis(values, self.max_points, self.downsample,
+                self.fixed_interval, self.tracer)
+
+    def _add_series(self, name, values, analysis):
+        '''
+        Add the description of one analysed series to the graph descriptor dictionary.
+        '''
         if analysis['name'] == analysers.UNPROCESSABLE:
             self.result_dict = analysis
         else:
@@ -165,12 +352,12 @@ class GraphiteGraph(AutoGraph):
                 distribution_name = analysis['name']
 
             series_dict = {
-                "name": series['target'],
+                "name": name,
                 "distribution": distribution_name,
-                "min_y_value": analysis['min_y_value'],
+                "min_y_value": _number(analysis['min_y_value'], values.integral),
                 "fit": analysis['p_value'],
-                "start_value": {"x": values[0].x, "y": values[0].y},
-                "end_value": {"x": values[-1].x, "y": values[-1].y},
+                "start_value": {"x": values[0].x, "y": _number(values[0].y, values.integral)},
+                "end_value": {"x": values[-1].x, "y": _number(values[-1].y, values.integral)},
                 "num_values": len(values)
             }
 
@@ -182,24 +369,304 @@ class GraphiteGraph(AutoGraph):
         in the graph, used for overall graph description.
         '''
 
-        min_x = self.result_dict['x_axis']['min']
-        max_x = self.result_dict['x_axis']['max']
-        min_y = self.result_dict['y_axis']['min']
-        max_y = self.result_dict['y_axis']['max']
-        for x, y in values:
-            min_x = min(x, min_x)
-            min_y = min(y, min_y)
-            max_x = max(x, max_x)
-            max_y = max(y, max_y)
-        self.result_dict['x_axis']['min'] = min_x
-        self.result_dict['x_axis']['max'] = max_x
-        self.result_dict['y_axis']['min'] = min_y
-        self.result_dict['y_axis']['max'] = max_y
+        if not len(values):
+            return
+        self._merge_extremes(values.x.min().item(), values.x.max().item(),
+                values.y.min(), values.y.max(), values.integral)
+
+    def _merge_extremes(self, min_x, max_x, min_y, max_y, integral):
+        x_axis = self.result_dict['x_axis']
+        y_axis = self.result_dict['y_axis']
+        min_y, max_y = _number(min_y, integral), _number(max_y, integral)
+        x_axis['min'] = min(min_x, x_axis['min'])
+        x_axis['max'] = max(max_x, x_axis['max'])
+        y_axis['min'] = min(min_y, y_axis['min'])
+        y_axis['max'] = max(max_y, y_axis['max'])
 
     def _convert_points(self, list_of_points):
         '''
-        Pulls data values out of the raw data and produces objects suitable for later use.
+        Pulls data values out of the raw data and produces a points.Series for later use.
         '''
-        # NOTE: Graphite uses None for "no value", but want to plot at '0'
-        the_points = [points.Point(x, y or 0) for [y, x] in list_of_points]
-        return the_points
+        if isinstance(list_of_points, points.Series):
+            return list_of_points
+        return points.Series.from_graphite(list_of_points)
+
+
+class GraphiteCompactGraph(GraphiteGraph):
+    '''
+    Expects series in graphite's compact start/end/step form, as returned
+    (once decoded) by its pickle and msgpack render formats:
+
+        {'graphite_data': [{'name': 'servers.a.requests', 'start': 1407123600,
+                            'end': 1407127200, 'step': 60, 'values': [...]}]}
+
+    A 'target' may be given in place of the 'name'. The x values are built
+    from start and step, so they are evenly spaced by construction and the
+    interval check is skipped. As in graphite, end is exclusive: there must
+    be one value for each step from start up to end.
+    '''
+
+    fixed_interval = True
+
+    def _read_series(self, series):
+        start, end, step = series['start'], series['end'], series['step']
+        if step <= 0:
+            raise ValueError("step must be positive, not {0}".format(step))
+        name = series['name'] if 'name' in series else series['target']
+        values = series['values']
+        expected = max((end - start) // step, 0)
+        if len(values) != expected:
+            raise ValueError("Series {0!r} has {1} values, but start {2}, end {3} "
+                    "and step {4} call for {5}".format(
+                        name, len(values), start, end, step, expected))
+        return name, points.Series.from_range(start, step, values)
+
+
+class WhisperGraph(GraphiteCompactGraph):
+    '''
+    Reads series straight from graphite's Whisper files, given the path of
+    one file or of a directory to search for them. For a time range, or
+    title and axis metadata, give a dictionary instead:
+
+        {'path': '/opt/graphite/storage/whisper/servers',
+         'from_time': 1407123600, 'until_time': 1407127200, 'title': ...}
+
+    Times default to the whole retention period of each file, up to now.
+    '''
+
+    def auto_ingest(self, raw_data):
+        if not isinstance(raw_data, dict):
+            raw_data = {'path': raw_data}
+        path = raw_data['path']
+        times = dict((key, raw_data[key])
+                for key in ('from_time', 'until_time', 'now') if key in raw_data)
+        if os.path.isdir(path):
+            series = list(whisper.walk(path, **times))
+        else:
+            series = [whisper.read(path, **times)]
+        raw_data = dict(raw_data, graphite_data=series)
+        GraphiteCompactGraph.auto_ingest(self, raw_data)
+
+
+class ArchiveGraph(GraphiteGraph):
+    '''
+    Reads series saved by the archive module, given the path of the archive
+    file, or a dictionary with the path and any title or axis metadata to
+    use in place of that saved.
+    '''
+
+    def auto_ingest(self, raw_data):
+        if not isinstance(raw_data, dict):
+            raw_data = {'path': raw_data}
+        data = archive.load(raw_data['path'])
+        data.update((key, value) for key, value in raw_data.items() if key != 'path')
+        GraphiteGraph.auto_ingest(self, data)
+
+
+class GraphiteJSONGraph(GraphiteGraph):
+    '''
+    A GraphiteGraph which reads graphite's format=json output directly, as
+    bytes, text or a file object such as an HTTP response. The datapoints are
+    parsed a chunk at a time straight into arrays; see the streaming module.
+
+    The raw output may also be given as the 'graphite_data' of the usual
+    dictionary, alongside the title and axis metadata.
+    '''
+
+    def auto_ingest(self, raw_data):
+        if isinstance(raw_data, dict):
+            raw_data = dict(raw_data)
+        else:
+            raw_data = {'graphite_data': raw_data}
+        if not isinstance(raw_data['graphite_data'], list):
+            raw_data['graphite_data'] = streaming.iter_graphite(raw_data['graphite_data'])
+        GraphiteGraph.auto_ingest(self, raw_data)
+
+
+class LiveSeries(object):
+    '''
+    The latest points of one live series, along with the running statistics
+    the analysers need, all updated in time proportional to the number of new
+    points.
+
+    Points are held in buffers which grow by doubling. If window is given,
+    only the latest window points are kept, and older ones are dropped as new
+    ones arrive.
+
+    The series is integral (see points.Series) while every point added to it
+    came from integers.
+    '''
+
+    def __init__(self, window=None, capacity=64):
+        if window is not None and window < 1:
+            raise ValueError("window must be at least 1, not {0}".format(window))
+        self.window = window
+        self.integral = True
+        self.fit = analysers.RunningLinearFit()
+        self._x = np.empty(capacity)
+        self._y = np.empty(capacity)
+        # Running area with no minimum subtracted; see context()
+        self._area = np.empty(capacity)
+        self._start = 0
+        self._end = 0
+        # Absolute index of buffer slot 0, which moves when the buffers are compacted
+        self._offset = 0
+        # Monotonic queues of (absolute index, y) for the window minimum and maximum
+        self._lows = deque()
+        self._highs = deque()
+
+    def __len__(self):
+        return self._end - self._start
+
+    def extend(self, values):
+        '''
+        Append a points.Series. Points at or before the latest x value
+        already held are ignored.
+        '''
+        values = values.sorted()
+        x_values, y_values = values.x, values.y
+        if len(self):
+            newer = x_values > self._x[self._end - 1]
+            x_values, y_values = x_values[newer], y_values[newer]
+        count = len(x_values)
+        if not count:
+            return
+        self.integral = self.integral and values.integral
+
+        self._reserve(count)
+        start, end = self._end, self._end + count
+        self._x[start:end] = x_values
+        self._y[start:end] = y_values
+
+        first = max(start - 1, self._start)
+        xs = self._x[first:end]
+        ys = self._y[first:end]
+        steps = (.5 * np.diff(xs) * np.abs(np.diff(ys))
+                + np.minimum(ys[1:], ys[:-1]))
+        if first == start:
+            self._area[start] = 0
+            np.cumsum(steps, out=self._area[start + 1:end])
+        else:
+            np.cumsum(steps, out=self._area[start:end])
+            self._area[start:end] += self._area[first]
+
+        for index, y in enumerate(y_values.tolist(), self._offset + start):
+            while self._lows and self._lows[-1][1] >= y:
+                self._lows.pop()
+            self._lows.append((index, y))
+            while self._highs and self._highs[-1][1] <= y:
+                self._highs.pop()
+            self._highs.append((index, y))
+
+        self.fit.update(x_values, y_values)
+        self._end = end
+
+        if self.window is not None and len(self) > self.window:
+            self._evict(len(self) - self.window)
+
+    def _evict(self, count):
+        start = self._start
+        self.fit.downdate(self._x[start:start + count], self._y[start:start + count])
+        self._start += count
+        first_kept = self._offset + self._start
+        while self._lows[0][0] < first_kept:
+            self._lows.popleft()
+        while self._highs[0][0] < first_kept:
+            self._highs.popleft()
+
+    def _reserve(self, count):
+        '''
+        Make room for count more points, first by moving the held points to
+        the front of the buffers, then if need be by doubling their size.
+        '''
+        capacity = len(self._x)
+        if self._end + count <= capacity:
+            return
+        size = len(self)
+        if self._start:
+            start, end = self._start, self._end
+            self._x[:size] = self._x[start:end]
+            self._y[:size] = self._y[start:end]
+            self._area[:size] = self._area[start:end] - self._area[start]
+            self._offset += start
+            self._start, self._end = 0, size
+            # Refit from scratch now and again, so errors from removing
+            # evicted points cannot build up
+            self.fit = analysers.RunningLinearFit()
+            self.fit.update(self._x[:size], self._y[:size])
+        if size + count > capacity:
+            capacity = max(2 * capacity, size + count)
+            for name in ('_x', '_y', '_area'):
+                grown = np.empty(capacity)
+                grown[:size] = getattr(self, name)[:size]
+                setattr(self, name, grown)
+
+    def context(self):
+        '''
+        Return an analysers.SeriesContext for the points held right now. It
+        shares the buffers, so should not be kept after more points arrive.
+        '''
+        start, end = self._start, self._end
+        if start == end:
+            return analysers.SeriesContext.from_points(points.Series([], []))
+        min_y = self._lows[0][1]
+        max_y = self._highs[0][1]
+        area = ((self._area[start:end] - self._area[start])
+                - np.arange(end - start) * min_y)
+        values = points.Series(self._x[start:end], self._y[start:end],
+                integral=self.integral)
+        return analysers.SeriesContext.from_running(values, self.fit, area,
+                min_y, max_y)
+
+
+class LiveGraphiteGraph(GraphiteGraph):
+    '''
+    A GraphiteGraph for live feeds, which accepts new datapoints for each
+    target as they arrive.
+
+    auto_ingest() takes the usual graphite data, and append() adds more
+    datapoints to one target. Each target is held as a LiveSeries, so the
+    cost of an update depends on the number of new points, not the length of
+    the series. as_dict(), and so wordgraph.describe(graph), analyses the
+    current state on demand.
+
+    If window is given, only the latest window points of each target are used.
+    '''
+
+    def __init__(self, window=None, max_points=None, downsample='lttb', tracer=None):
+        GraphiteGraph.__init__(self, max_points, downsample, tracer)
+        self.window = window
+        self.metadata = {}
+        self.live_series = OrderedDict()
+
+    def auto_ingest(self, raw_data):
+        self.metadata = self._metadata(raw_data)
+        for series in raw_data['graphite_data']:
+            self.append(series['target'], series['datapoints'])
+
+    def append(self, target, datapoints):
+        '''
+        Add graphite [value, timestamp] datapoints (or a points.Series) to
+        the named target.
+        '''
+        if target not in self.live_series:
+            self.live_series[target] = LiveSeries(self.window)
+        self.live_series[target].extend(self._convert_points(datapoints))
+
+    def iter_series(self):
+        for target, live in self.live_series.items():
+            yield target, live.context().series
+
+    def as_dict(self):
+        self.result_dict = copy.deepcopy(self.defaults)
+        for target, live in self.live_series.items():
+            context = live.context()
+            with self.tracer.span('series', target=target, points=context.n):
+                if context.n:
+                    self._merge_extremes(context.min_x, context.max_x,
+                            context.min_y, context.max_y, context.series.integral)
+                self._add_series(target, context.series, self._analyse(context))
+            if self.result_dict.get('name') == analysers.UNPROCESSABLE:
+                return self.result_dict
+        self._apply_metadata(self.metadata)
+        return GraphiteGraph.as_dict(self)
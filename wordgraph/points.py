@@ -13,13 +13,20 @@
 # limitations under the License.
 
 '''
-This module just contains a simple class for representing cartesian points. 
+This module contains simple classes for representing cartesian points.
 
-It contains the Point class, and even that is just a named tuple!
+The Point class is just a named tuple, and is convenient for small, hand
+built graphs. The Series class holds a whole data series as two columns of
+numbers, which is much cheaper for the long series produced by graphite.
 '''
 
 
 from collections import namedtuple
+from operator import itemgetter
+
+from ._lazy import lazy_import
+
+np = lazy_import('numpy')
 
 class Point(namedtuple('BasePoint', ['x', 'y'])):
     """Point in two-dimenstional space.
@@ -27,3 +34,133 @@ class Point(namedtuple('BasePoint', ['x', 'y'])):
     Represents a point in two-dimensional space with offsets on the 'x'
     (horizontal) and 'y' (vertical) planes.
     """
+
+
+class Series(object):
+    """Columnar series of points in two-dimensional space.
+
+    The x and y values are held in two contiguous numpy arrays of the same
+    length. The dtype defaults to float64; float32 halves the memory used,
+    but cannot hold unix timestamps to the second, so it only suits series
+    with small x values.
+
+    Indexing or iterating over a series produces Point objects, so code
+    written against lists of points keeps working. Code on the hot path
+    should use the x and y arrays directly instead.
+
+    integral records that the y values were given as integers, such as
+    graphite's counts, so that they can be described as integers again.
+    """
+
+    def __init__(self, x, y, dtype='float64', integral=False):
+        self.x = np.ascontiguousarray(x, dtype=dtype)
+        self.y = np.ascontiguousarray(y, dtype=dtype)
+        self.integral = integral
+        if self.x.ndim != 1 or self.x.shape != self.y.shape:
+            raise ValueError("x and y must be one-dimensional and of equal length")
+
+    @classmethod
+    def from_points(cls, points, dtype='float64'):
+        '''
+        Build a series from an iterable of Point objects (or (x, y) pairs).
+        '''
+        points = list(points)
+        x = np.fromiter((point[0] for point in points), dtype=dtype, count=len(points))
+        y = np.fromiter((point[1] for point in points), dtype=dtype, count=len(points))
+        return cls(x, y, dtype=dtype)
+
+    @classmethod
+    def from_graphite(cls, datapoints, dtype='float64'):
+        '''
+        Build a series from graphite [value, timestamp] pairs in one step.
+
+        Graphite uses None for "no value"; these are stored as 0 so that they
+        plot at the x axis.
+        '''
+        pairs = np.array(datapoints, dtype=dtype)
+        if pairs.size == 0:
+            pairs = pairs.reshape(0, 2)
+        elif pairs.ndim != 2 or pairs.shape[1] != 2:
+            raise ValueError("graphite datapoints must be [value, timestamp] pairs")
+        y = pairs[:, 0]
+        y[np.isnan(y)] = 0
+        if hasattr(datapoints, 'dtype'):
+            integral = _integral(datapoints)
+        else:
+            integral = _integral(map(itemgetter(0), datapoints))
+        return cls(pairs[:, 1], y, dtype=dtype, integral=integral)
+
+    @classmethod
+    def from_range(cls, start, step, values, dtype='float64'):
+        '''
+        Build a series from y values taken at fixed intervals, as in
+        graphite's start/end/step formats. The x values are start,
+        start + step, and so on. None values are stored as 0, as in
+        from_graphite.
+        '''
+        y = np.array(values, dtype=dtype).reshape(-1)
+        y[np.isnan(y)] = 0
+        x = start + step * np.arange(len(y), dtype=dtype)
+        return cls(x, y, dtype=dtype, integral=_integral(values))
+
+    @property
+    def dtype(self):
+        return self.x.dtype
+
+    def __len__(self):
+        return len(self.x)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return Series(self.x[index], self.y[index], dtype=self.dtype,
+                    integral=self.integral)
+        return Point(self.x[index].item(), self.y[index].item())
+
+    def __iter__(self):
+        for x, y in zip(self.x.tolist(), self.y.tolist()):
+            yield Point(x, y)
+
+    def __repr__(self):
+        return "Series(<{0} points, {1}>)".format(len(self), self.dtype)
+
+    def points(self):
+        '''
+        Return the series as a list of Point objects.
+        '''
+        return list(self)
+
+    def is_sorted(self):
+        '''
+        True if the x values never decrease.
+        '''
+        return bool(np.all(self.x[1:] >= self.x[:-1]))
+
+    def sorted(self):
+        '''
+        Return the series ordered by x value. Points with equal x values keep
+        their relative order. Returns the series itself if already in order.
+        '''
+        if self.is_sorted():
+            return self
+        order = np.argsort(self.x, kind='stable')
+        return Series(self.x[order], self.y[order], dtype=self.dtype,
+                integral=self.integral)
+
+
+def _integral(values):
+    '''
+    True if values holds no floats. None, graphite's "no value", counts as
+    an integer, as it is stored as 0.
+    '''
+    if hasattr(values, 'dtype'):
+        return values.dtype.kind in 'biu'
+    return not any(issubclass(kind, float) for kind in set(map(type, values)))
+
+
+def as_series(values):
+    '''
+    Return values as a Series, converting from a sequence of points if needed.
+    '''
+    if isinstance(values, Series):
+        return values
+    return Series.from_points(values)
@@ -13,4 +13,10 @@
 # limitations under the License.
 # Author: Ryan Stuart <ryan.stuart.85@gmail.com>
 
-from .realiser import *
\ No newline at end of file
+from .realiser import *
+from . import realiser as _realiser
+
+
+def __getattr__(name):
+    # env is created lazily by the realiser module
+    return getattr(_realiser, name)
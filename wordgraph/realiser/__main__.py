@@ -0,0 +1,34 @@
+# Copyright 2014 Tennessee Leeuwenburg
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compile the bundled templates into Python modules in the given directory:
+
+    python -m wordgraph.realiser <directory>
+"""
+import argparse
+
+from .realiser import compile_templates
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m wordgraph.realiser',
+            description='Compile the bundled templates into Python modules.')
+    parser.add_argument('directory', help='where to write the compiled templates')
+    args = parser.parse_args(argv)
+    compile_templates(args.directory)
+
+
+if __name__ == '__main__':
+    main()
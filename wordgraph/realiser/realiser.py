@@ -23,17 +23,108 @@ example). The class approach can also generate short descriptions.
 If you use the realiser classes directly then you will probably be interested in
 ``short()`` and ``long()`` methods.
 
+Parsing the templates is a noticeable part of the first description in each
+process. To avoid it, compile the bundled templates to Python modules once
+with ``compile_templates()`` (or ``python -m wordgraph.realiser <directory>``),
+and load them with ``use_compiled_templates()``. Alternatively
+``use_bytecode_cache()`` keeps parsed templates in a directory shared between
+processes. The ``WORDGRAPH_COMPILED_TEMPLATES`` and ``WORDGRAPH_TEMPLATE_CACHE``
+environment variables do the same when the realiser is imported, and
+``preload()`` loads every template up front, for example in a server before it
+forks its workers.
+
+Jinja2 and num2words are only imported, and the Jinja2 ``env`` only created,
+when the first description is rendered.
+
 """
-from jinja2 import Environment, PackageLoader
-import num2words
+import os
+
+from .._lazy import lazy_import
 
-env = Environment(loader=PackageLoader('wordgraph.realiser', 'templates'))
+jinja2 = lazy_import('jinja2')
+num2words = lazy_import('num2words')
 
 
 def num_to_word(data):
     number = int(data)
-    return num2words(number, ordinal=True)
-env.filters['num_to_word'] = num_to_word
+    return num2words.num2words(number, ordinal=True)
+
+
+def _package_loader():
+    return jinja2.PackageLoader('wordgraph.realiser', 'templates')
+
+
+def _create_environment(loader, bytecode_cache=None):
+    environment = jinja2.Environment(loader=loader, bytecode_cache=bytecode_cache)
+    environment.filters['num_to_word'] = num_to_word
+    return environment
+
+
+def _compiled_loader(path):
+    # Fall back to the bundled sources for anything not compiled
+    return jinja2.ChoiceLoader([jinja2.ModuleLoader(path), _package_loader()])
+
+
+def _default_environment():
+    loader = _package_loader()
+    compiled = os.environ.get('WORDGRAPH_COMPILED_TEMPLATES')
+    if compiled:
+        loader = _compiled_loader(compiled)
+    bytecode_cache = None
+    cache_directory = os.environ.get('WORDGRAPH_TEMPLATE_CACHE')
+    if cache_directory:
+        bytecode_cache = jinja2.FileSystemBytecodeCache(cache_directory)
+    return _create_environment(loader, bytecode_cache)
+
+
+def _environment():
+    global env
+    try:
+        return env
+    except NameError:
+        env = _default_environment()
+        return env
+
+
+def __getattr__(name):
+    # Create env on first use
+    if name == 'env':
+        return _environment()
+    raise AttributeError("module {0!r} has no attribute {1!r}".format(__name__, name))
+
+
+def compile_templates(target, zip=None):
+    """
+    Compile the bundled templates into Python modules in the target directory
+    (or zip file, with zip set to 'deflated' or 'stored'), for loading with
+    ``use_compiled_templates()``.
+    """
+    _create_environment(_package_loader()).compile_templates(
+            target, zip=zip, ignore_errors=False)
+
+
+def use_compiled_templates(path):
+    """
+    Render from templates compiled by ``compile_templates()``.
+    """
+    global env
+    env = _create_environment(_compiled_loader(path), _environment().bytecode_cache)
+
+
+def use_bytecode_cache(directory):
+    """
+    Keep parsed templates as bytecode files in directory, so that later
+    processes can skip parsing them.
+    """
+    _environment().bytecode_cache = jinja2.FileSystemBytecodeCache(directory)
+
+
+def preload():
+    """
+    Load every bundled template now, rather than on first use.
+    """
+    for name in _package_loader().list_templates():
+        _environment().get_template(name)
 
 
 def english(graph):
@@ -97,10 +188,10 @@ class English(Realiser):
             return "Graph invalid, because %s" % data["result"]
         elif self._single_data_series_with_one_point(data):
             # If there's only one series and it consists of a single point, skip the part where we explain what the range of the data is, as it's meaningless. 
-            template = env.get_template("en/long/single-point.txt")
+            template = _environment().get_template("en/long/single-point.txt")
         else:
             # But if there's more than one series, suddenly the range etc becomes relevant again, even if one of the series consists of a single data point.
-            template = env.get_template("en/long/desc.txt")
+            template = _environment().get_template("en/long/desc.txt")
         return template.render(data)
 
     def short(self):
@@ -113,9 +204,9 @@ class English(Realiser):
         if 'name' in data and data['name'] == "Unprocessable":
             return "Graph may be invalid, because %s" % data["result"]
         elif self._single_data_series_with_one_point(data):
-            template = env.get_template("en/short/single-point.txt")
+            template = _environment().get_template("en/short/single-point.txt")
         else:
-            template = env.get_template("en/short/desc.txt")
+            template = _environment().get_template("en/short/desc.txt")
         return template.render(data)
 
 
@@ -0,0 +1,356 @@
+# Copyright 2014 Tennessee Leeuwenburg
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+A standalone HTTP service for describing graphs, built on the standard
+library alone so that it can be run and load tested on one machine:
+
+    $ python -m wordgraph.server --port 8080 --workers 4
+
+POST the data to /describe, choosing the source and other describe options
+in the query string:
+
+    $ curl --data-binary @render.json 'http://localhost:8080/describe?source=graphite-json'
+
+The body is graphite's raw JSON output for source=graphite-json, or for the
+other sources (graphite, graphite-compact) the JSON form describe takes, such
+as {"title": ..., "graphite_data": [...]}. A title given in the query string
+is applied on top. The response is the description as plain text, or with
+format=json a JSON object holding the text and the structure it was
+generated from.
+
+Descriptions run on a pool of worker processes which is started, and loads
+the templates, before the first request is accepted. Connections are kept
+alive between requests. Requests are refused with 413 if their body is over
+max_body bytes, and with 503 if max_queue requests are already being
+described. If the workers die, the request is refused with 503 and a pool the
+server started is replaced; one it was given cannot be, so the server
+reports itself broken from then on. The language and demographic may be
+given, but only the defaults (English, summary) are supported so far.
+GET /health returns the server's counters as JSON, with status 503 once the
+server is broken.
+'''
+
+import argparse
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from . import describer
+from . import realiser
+from ._lazy import lazy_import
+
+futures = lazy_import('concurrent.futures')
+
+SOURCES = ('graphite', 'graphite-json', 'graphite-compact')
+# The only language and demographic the realiser can produce so far
+LANGUAGES = ('English',)
+DEMOGRAPHICS = ('summary',)
+
+
+def _warm():
+    '''
+    Run once in each worker, so the first requests do not pay for imports.
+    '''
+    realiser.preload()
+    describer.grapher.np.zeros(1)
+
+
+def _describe_request(body, source, options, title, structured):
+    '''
+    Describe the body of one request, in a worker process.
+    '''
+    if source == 'graphite-json':
+        data = {'graphite_data': body}
+    else:
+        data = json.loads(body.decode('utf-8'))
+        if not isinstance(data, dict):
+            raise ValueError("Expected a JSON object with the graph data")
+    if title is not None:
+        data['title'] = title
+    graph = describer._ingest(data, source, **options)
+    structure = graph.as_dict()
+    text = realiser.english(structure)
+    if structured:
+        return json.dumps({'text': text, 'graph': structure})
+    return text
+
+
+class DescribeServer(ThreadingHTTPServer):
+    '''
+    The HTTP server, holding the worker pool, limits and counters. Each
+    connection is handled on its own thread, which waits on the pool.
+
+    executor may be given to use an existing pool; otherwise a process pool
+    of workers processes is started. timeout is the longest a description
+    may take, and keep_alive how long an idle connection is held open, both
+    in seconds.
+    '''
+
+    daemon_threads = True
+
+    def __init__(self, address, workers=None, executor=None, max_body=16 << 20,
+            max_queue=64, timeout=30, keep_alive=15, cache=None, sources=SOURCES):
+        self.max_body = max_body
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.keep_alive = keep_alive
+        self.cache = cache
+        self.sources = sources
+        self.started = time.time()
+        self.broken = False
+        self._lock = threading.Lock()
+        self._replace_lock = threading.Lock()
+        self.stats = dict.fromkeys(('requests', 'described', 'errors', 'rejected',
+                'in_flight', 'seconds', 'restarts'), 0)
+        self._own_executor = executor is None
+        if executor is None:
+            workers = workers or os.cpu_count() or 1
+        self.workers = workers
+        self.executor = self._start_pool() if executor is None else executor
+        ThreadingHTTPServer.__init__(self, address, DescribeHandler)
+
+    def _start_pool(self):
+        executor = futures.ProcessPoolExecutor(max_workers=self.workers)
+        for job in [executor.submit(_warm) for worker in range(self.workers)]:
+            job.result()
+        return executor
+
+    def replace(self, executor):
+        '''
+        Start a new pool in place of a broken one, unless another request has
+        already done so. A pool given to the server is not replaced; the
+        server is marked broken instead.
+        '''
+        with self._replace_lock:
+            if self.executor is not executor or self.broken:
+                return
+            if not self._own_executor:
+                self.broken = True
+                return
+            executor.shutdown(wait=False)
+            try:
+                self.executor = self._start_pool()
+            except futures.BrokenExecutor:
+                self.broken = True
+                return
+            self.count(restarts=1)
+
+    def count(self, **changes):
+        with self._lock:
+            for key, change in changes.items():
+                self.stats[key] += change
+
+    def admit(self):
+        '''
+        Reserve a place in the queue, returning False if it is full.
+        '''
+        with self._lock:
+            self.stats['requests'] += 1
+            if self.stats['in_flight'] >= self.max_queue:
+                self.stats['rejected'] += 1
+                return False
+            self.stats['in_flight'] += 1
+            return True
+
+    def submit(self, *args):
+        '''
+        Run a job on the pool, in the place reserved by admit(). The place is
+        given up when the job finishes, even if its request has timed out, so
+        the queue counts the jobs which are still taking up workers.
+        '''
+        job = self.executor.submit(*args)
+        job.add_done_callback(lambda job: self.count(in_flight=-1))
+        return job
+
+    def health(self):
+        with self._lock:
+            health = dict(self.stats)
+        described = health['described']
+        health.update(status='broken' if self.broken else 'ok', workers=self.workers, max_queue=self.max_queue,
+                uptime=time.time() - self.started,
+                mean_seconds=health['seconds'] / described if described else None)
+        if self.cache is not None:
+            health.update(cache_hits=self.cache.hits, cache_misses=self.cache.misses)
+        return health
+
+    def server_close(self):
+        ThreadingHTTPServer.server_close(self)
+        if self._own_executor:
+            try:
+                self.executor.shutdown(wait=False, cancel_futures=True)
+            except TypeError:
+                # cancel_futures is new in Python 3.9
+                self.executor.shutdown(wait=False)
+
+
+class DescribeHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'wordgraph'
+
+    def setup(self):
+        self.timeout = self.server.keep_alive
+        BaseHTTPRequestHandler.setup(self)
+
+    def log_message(self, format, *args):
+        # Counted in the health statistics instead
+        pass
+
+    def send_text(self, status, text, content_type='text/plain; charset=utf-8',
+            headers=()):
+        body = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for header in headers:
+            self.send_header(*header)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if urlsplit(self.path).path != '/health':
+            return self.send_text(404, "Not found\n")
+        health = self.server.health()
+        self.send_text(503 if self.server.broken else 200, json.dumps(health),
+                'application/json')
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path != '/describe':
+            self.close_connection = True
+            return self.send_text(404, "Not found\n")
+
+        length = self.headers.get('Content-Length')
+        if length is None or not length.isdigit():
+            self.close_connection = True
+            self.server.count(requests=1, errors=1)
+            return self.send_text(411, "A Content-Length is required\n")
+        length = int(length)
+        if length > self.server.max_body:
+            # The body is not read, so the connection cannot be reused
+            self.close_connection = True
+            self.server.count(requests=1, rejected=1)
+            return self.send_text(413, "Request body over {0} bytes\n".format(
+                self.server.max_body))
+        body = self.rfile.read(length)
+
+        try:
+            query = dict((key, values[-1]) for key, values in
+                    parse_qs(url.query, strict_parsing=bool(url.query)).items())
+            source = query.get('source', 'graphite')
+            if source not in self.server.sources:
+                raise ValueError("Unsupported source {0!r}".format(source))
+            for name, supported in (('language', LANGUAGES),
+                    ('demographic', DEMOGRAPHICS)):
+                if query.get(name, supported[0]) not in supported:
+                    raise ValueError("Unsupported {0} {1!r}".format(name, query[name]))
+            options = {'downsample': query.get('downsample', 'lttb')}
+            if 'max_points' in query:
+                options['max_points'] = int(query['max_points'])
+            structured = query.get('format', 'text') == 'json'
+        except ValueError as ex:
+            self.server.count(requests=1, errors=1)
+            return self.send_text(400, "{0}\n".format(ex))
+
+        if not self.server.admit():
+            return self.send_text(503, "Too many requests in progress\n",
+                    headers=[('Retry-After', '1')])
+        self._job = None
+        try:
+            self._describe(body, source, options, query.get('title'), structured)
+        finally:
+            # Once a job is submitted, its place is given up when it finishes
+            if self._job is None:
+                self.server.count(in_flight=-1)
+
+    def _describe(self, body, source, options, title, structured):
+        server = self.server
+        key = None
+        if server.cache is not None and not structured:
+            key = describer._cache_key(server.cache, [body, title], source, **options)
+            text = server.cache.get(key)
+            if text is not None:
+                server.count(described=1)
+                return self.send_text(200, text)
+
+        started = time.monotonic()
+        executor = server.executor
+        try:
+            self._job = server.submit(_describe_request, body, source, options,
+                    title, structured)
+            text = self._job.result(server.timeout)
+        except futures.TimeoutError:
+            self._job.cancel()
+            server.count(errors=1)
+            return self.send_text(504, "Description timed out\n")
+        except futures.BrokenExecutor:
+            server.count(errors=1)
+            server.replace(executor)
+            return self.send_text(503, "The workers failed; try again\n",
+                    headers=[('Retry-After', '1')])
+        except (ValueError, KeyError, TypeError) as ex:
+            server.count(errors=1)
+            return self.send_text(400, "Could not describe the data: {0}\n".format(ex))
+        except Exception as ex:
+            server.count(errors=1)
+            return self.send_text(500, "Description failed: {0!r}\n".format(ex))
+        server.count(described=1, seconds=time.monotonic() - started)
+
+        if structured:
+            return self.send_text(200, text, 'application/json')
+        if key is not None:
+            server.cache.put(key, text)
+        self.send_text(200, text)
+
+
+def serve(host='127.0.0.1', port=8080, **options):
+    '''
+    Run a DescribeServer until interrupted. See DescribeServer for options.
+    '''
+    server = DescribeServer((host, port), **options)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m wordgraph.server',
+            description='Serve graph descriptions over HTTP.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=None,
+            help='worker processes (default: one per CPU)')
+    parser.add_argument('--max-body', type=int, default=16 << 20,
+            help='largest request body accepted, in bytes')
+    parser.add_argument('--max-queue', type=int, default=64,
+            help='most requests described or waiting at once')
+    parser.add_argument('--timeout', type=float, default=30,
+            help='longest a description may take, in seconds')
+    parser.add_argument('--cache', type=int, default=0,
+            help='number of descriptions to cache (default: none)')
+    args = parser.parse_args(argv)
+    cache = describer.DescriptionCache(maxsize=args.cache) if args.cache else None
+    serve(args.host, args.port, workers=args.workers, max_body=args.max_body,
+            max_queue=args.max_queue, timeout=args.timeout, cache=cache)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,280 @@
+# Copyright 2014 Tennessee Leeuwenburg
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+Incremental parsing of graphite's format=json render output.
+
+The usual route, json.loads followed by GraphiteGraph, builds a Python list
+for every datapoint and then converts them all again. The functions here read
+the raw response (bytes, text, or a file object such as an HTTP response) a
+chunk at a time and convert each chunk of datapoints straight into numeric
+arrays, so memory use stays close to the size of the final arrays.
+
+    > with urlopen(render_url) as response:
+    >     graph = {'graphite_data': streaming.load_graphite(response)}
+    > text = wordgraph.describe(graph, source='graphite')
+
+or, equivalently, pass the response itself with source='graphite-json'.
+'''
+
+import io
+import json
+import re
+
+from ._lazy import lazy_import
+from .points import Series
+
+np = lazy_import('numpy')
+
+CHUNK_SIZE = 1 << 16
+# Series objects up to this size are decoded whole, which is quicker than
+# parsing them a token at a time
+SMALL_SERIES = 1 << 12
+
+_WHITESPACE = re.compile(br'[ \t\r\n]*')
+# The end of the last pair of a datapoints list, followed by the end of the list
+_DATAPOINTS_END = re.compile(br'\]\s*\]')
+# Text only found in non-integer numbers
+_FLOAT = re.compile(br'[.eE]')
+# Tokens which bound a JSON value: a string, which may hold any of the
+# others, and the brackets of a list or object
+_STRING = re.compile(br'"(?:[^"\\]|\\.)*"')
+_NESTED = re.compile(br'"(?:[^"\\]|\\.)*"|[\[\]{}]')
+_SCALAR = re.compile(br'[^,:\]}\s]*')
+_decoder = json.JSONDecoder()
+
+
+def _value_end(buffer, pos):
+    '''
+    Find the end of the JSON value starting at buffer[pos] without decoding
+    it, or return None if it may run past the end of the buffer.
+    '''
+    first = buffer[pos:pos + 1]
+    if first == b'"':
+        match = _STRING.match(buffer, pos)
+        return match.end() if match else None
+    if first in (b'[', b'{'):
+        depth = 0
+        for match in _NESTED.finditer(buffer, pos):
+            token = match.group()
+            if token in (b'[', b'{'):
+                depth += 1
+            elif token in (b']', b'}'):
+                depth -= 1
+                if not depth:
+                    return match.end()
+        return None
+    end = _SCALAR.match(buffer, pos).end()
+    return end if end < len(buffer) else None
+
+
+class _Reader(object):
+    '''
+    A buffered window onto the input, read chunk_size bytes at a time.
+    '''
+
+    def __init__(self, source, chunk_size):
+        if isinstance(source, str):
+            source = source.encode('utf-8')
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            source = io.BytesIO(source)
+        self.source = source
+        self.chunk_size = chunk_size
+        self.buffer = b''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        '''
+        Read another chunk, dropping what has already been consumed.
+        Returns False at the end of the input.
+        '''
+        if self.eof:
+            return False
+        chunk = self.source.read(self.chunk_size)
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        '''
+        Skip whitespace and return the next character, or None at the end.
+        '''
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos:self.pos + 1]
+            if not self.fill():
+                return None
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError("Malformed graphite data: expected {0!r} at byte {1}".format(
+                char.decode('ascii'), self.pos))
+        self.pos += 1
+
+    def value(self):
+        '''
+        Decode the complete JSON value starting at the next character.
+        '''
+        self.peek()
+        while True:
+            # Only the value itself is decoded, not the rest of the buffer
+            end = _value_end(self.buffer, self.pos)
+            if end is not None:
+                text = self.buffer[self.pos:end].decode('utf-8', 'replace')
+                try:
+                    value, length = _decoder.raw_decode(text)
+                except ValueError:
+                    # Perhaps a string in the value was cut off by the
+                    # end of the buffer, making it look complete
+                    length = None
+                if length == len(text):
+                    self.pos = end
+                    return value
+            if not self.fill():
+                raise ValueError("Malformed graphite data near byte {0}".format(self.pos))
+
+    def small_object(self, limit):
+        '''
+        Decode the JSON object starting at the next character if it ends
+        within limit bytes, or return None, consuming nothing.
+        '''
+        if self.peek() != b'{':
+            return None
+        if len(self.buffer) - self.pos < limit:
+            self.fill()
+        try:
+            text = self.buffer[self.pos:self.pos + limit].decode('utf-8')
+            value, end = _decoder.raw_decode(text)
+        except ValueError:
+            # Too long for the window, cut off, or malformed
+            return None
+        self.pos += len(text[:end].encode('utf-8'))
+        return value
+
+    def datapoints(self):
+        '''
+        Read a list of [value, timestamp] pairs into a points.Series.
+        '''
+        self.expect(b'[')
+        chunks = []
+        integral = True
+        if self.peek() == b']':
+            self.pos += 1
+        else:
+            while True:
+                end = _DATAPOINTS_END.search(self.buffer, self.pos)
+                if end is not None:
+                    region = self.buffer[self.pos:end.start() + 1]
+                    chunks.append(_parse_pairs(region))
+                    integral = integral and not _FLOAT.search(region)
+                    self.pos = end.end()
+                    break
+                # Parse the whole pairs read so far, but leave the closing
+                # bracket of the last one, which may turn out to be followed
+                # by the end of the list
+                last = self.buffer.rfind(b']', self.pos)
+                if last > self.pos:
+                    region = self.buffer[self.pos:last]
+                    chunks.append(_parse_pairs(region))
+                    integral = integral and not _FLOAT.search(region)
+                    self.pos = last
+                if not self.fill():
+                    raise ValueError("Malformed graphite data: unterminated datapoints")
+        if chunks:
+            pairs = np.concatenate(chunks) if len(chunks) > 1 else chunks[0]
+        else:
+            pairs = np.empty((0, 2))
+        y = pairs[:, 0]
+        # NOTE: Graphite uses None for "no value", but want to plot at '0'
+        y[np.isnan(y)] = 0
+        return Series(pairs[:, 1], y, integral=integral)
+
+
+def _parse_pairs(region):
+    '''
+    Convert text holding whole [value, timestamp] pairs into an n x 2 array.
+    The region may start with the end of the previous pair, and the closing
+    bracket of its own last pair may be missing.
+    '''
+    count = region.count(b'[')
+    text = region.translate(None, b'[]').lstrip(b' \t\r\n,')
+    if not count:
+        return np.empty((0, 2))
+    text = text.replace(b'null', b'nan').decode('ascii')
+    values = np.fromstring(text, sep=',')
+    if values.size != 2 * count:
+        raise ValueError("Malformed graphite datapoints")
+    return values.reshape(count, 2)
+
+
+def iter_graphite(source, chunk_size=CHUNK_SIZE):
+    '''
+    Parse graphite format=json output from bytes, text or a file object,
+    yielding a dict for each series as soon as it has been read. The
+    datapoints of each are a points.Series; any other keys (target, tags)
+    are decoded as usual.
+    '''
+    reader = _Reader(source, chunk_size)
+    reader.expect(b'[')
+    if reader.peek() == b']':
+        return
+    while True:
+        series = reader.small_object(SMALL_SERIES)
+        if series is not None:
+            if 'datapoints' in series:
+                series['datapoints'] = Series.from_graphite(series['datapoints'])
+            yield series
+        else:
+            yield _read_series(reader)
+        if reader.peek() != b',':
+            break
+        reader.pos += 1
+    reader.expect(b']')
+
+
+def _read_series(reader):
+    '''
+    Read one series object a token at a time, parsing its datapoints in
+    chunks.
+    '''
+    reader.expect(b'{')
+    series = {}
+    if reader.peek() != b'}':
+        while True:
+            key = reader.value()
+            reader.expect(b':')
+            if key == 'datapoints':
+                series[key] = reader.datapoints()
+            else:
+                series[key] = reader.value()
+            if reader.peek() != b',':
+                break
+            reader.pos += 1
+    reader.expect(b'}')
+    return series
+
+
+def load_graphite(source, chunk_size=CHUNK_SIZE):
+    '''
+    Parse graphite format=json output into a list of series, suitable for
+    the 'graphite_data' of a GraphiteGraph. See iter_graphite.
+    '''
+    return list(iter_graphite(source, chunk_size))
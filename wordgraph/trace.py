@@ -0,0 +1,328 @@
+# Copyright 2014 Tennessee Leeuwenburg
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+Instrumentation of the describe pipeline.
+
+Each stage of describing a graph runs inside a span, which records how long
+it took and attributes such as the number of points or an analyser's
+validity. Spans are handed to a Tracer when they start and finish. Collector
+keeps them in memory for inspection; subclass Tracer to send them elsewhere.
+
+    > collector = trace.Collector()
+    > text = wordgraph.describe(data, source='graphite', tracer=collector)
+    > for span in collector.find('analyser'):
+    >     print(span.attributes['analyser'], span.attributes['validity'], span.duration)
+    > print(collector.timings())
+
+The stages are:
+
+    describe        the whole call (with cache=True if answered from the cache)
+    ingest          reading the data into a graph
+    series          one series of the graph (target, points)
+    fixed_interval  checking the x values are evenly spaced
+    downsample      reducing a long series (points, method)
+    analyser        evaluating one analyser (analyser, validity)
+    realise         producing the text from the graph
+    format_dates    making the axis and series dates readable
+    render          rendering the text templates
+
+Without a tracer, the NULL tracer is used, whose spans do nothing.
+MemoryCollector also records the memory allocated in each stage.
+'''
+
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+
+
+class Span(object):
+    '''
+    One timed stage. start and end are time.perf_counter() values; parent is
+    the span it ran inside, on the same thread, if any.
+    '''
+
+    __slots__ = ('tracer', 'name', 'attributes', 'parent', 'start', 'end')
+
+    def __init__(self, tracer, name, attributes):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.parent = None
+        self.start = None
+        self.end = None
+
+    @property
+    def duration(self):
+        if self.end is None:
+            return None
+        return self.end - self.start
+
+    def set(self, **attributes):
+        '''
+        Add attributes to the span, such as results found while it runs.
+        '''
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        stack = self.tracer._stack()
+        self.parent = stack[-1] if stack else None
+        stack.append(self)
+        self.tracer.start(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.end = time.perf_counter()
+        self.tracer._stack().pop()
+        if exc_type is not None:
+            self.attributes['error'] = repr(exc_value)
+        self.tracer.finish(self)
+
+    def __repr__(self):
+        return 'Span({0!r}, {1!r}, duration={2!r})'.format(self.name,
+                self.attributes, self.duration)
+
+
+class Tracer(object):
+    '''
+    Receives each span as it starts and finishes. Override start and finish
+    to act on them; both do nothing here. A tracer may be shared between
+    threads, and spans on each thread nest separately.
+    '''
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def __getstate__(self):
+        # Graphs hold their tracer, and may be sent to other processes
+        state = self.__dict__.copy()
+        del state['_local']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def _stack(self):
+        try:
+            return self._local.stack
+        except AttributeError:
+            self._local.stack = []
+            return self._local.stack
+
+    def span(self, name, **attributes):
+        '''
+        Return a Span to use as a context manager around a stage.
+        '''
+        return Span(self, name, attributes)
+
+    def event(self, name, **attributes):
+        '''
+        Record something which happened at one moment, as a span of no
+        duration.
+        '''
+        with self.span(name, **attributes):
+            pass
+
+    def start(self, span):
+        pass
+
+    def finish(self, span):
+        pass
+
+
+class _NullSpan(object):
+
+    __slots__ = ()
+
+    def set(self, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _NullTracer(Tracer):
+    '''
+    The tracer used when none is given, which records nothing.
+    '''
+
+    def __reduce__(self):
+        return 'NULL'
+
+    def span(self, name, **attributes):
+        return _NULL_SPAN
+
+    def event(self, name, **attributes):
+        pass
+
+
+NULL = _NullTracer()
+
+
+class Collector(Tracer):
+    '''
+    A tracer which keeps every finished span in memory, in the order they
+    finished. If callback is given, it is also called with each finished span.
+
+    Spans finished in other processes are not collected.
+    '''
+
+    def __init__(self, callback=None):
+        Tracer.__init__(self)
+        self.callback = callback
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = Tracer.__getstate__(self)
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        Tracer.__setstate__(self, state)
+        self._lock = threading.Lock()
+
+    def finish(self, span):
+        with self._lock:
+            self.spans.append(span)
+        if self.callback is not None:
+            self.callback(span)
+
+    def find(self, name):
+        '''
+        Return the spans of the named stage.
+        '''
+        return [span for span in self.spans if span.name == name]
+
+    def timings(self):
+        '''
+        Return the total seconds spent in each stage, by stage name, in the
+        order the stages first finished.
+        '''
+        totals = OrderedDict()
+        for span in self.spans:
+            totals[span.name] = totals.get(span.name, 0) + span.duration
+        return totals
+
+    def clear(self):
+        with self._lock:
+            del self.spans[:]
+
+
+class MemoryCollector(Collector):
+    '''
+    A Collector which also records the memory allocated by Python in each
+    span, using tracemalloc. Each span gets the attributes:
+
+        memory_allocated    bytes still allocated at its end, over its start
+        memory_peak         the most bytes allocated at once during it, over
+                            the amount at its start
+
+    If tracemalloc was not already tracing, it is started with the first
+    span and stopped when that span finishes, and slows Python down
+    considerably while it runs. Memory is counted for the whole process, so
+    spans are only attributed correctly when one thread at a time is traced.
+
+    Before Python 3.9 tracemalloc's peak cannot be reset, so the peak of a
+    span is only known when it is higher than any before it. Otherwise the
+    larger of the sizes at its start and end is given instead.
+    '''
+
+    def __init__(self, callback=None):
+        Collector.__init__(self, callback)
+        # (start bytes, peak so far) for each open span, by id
+        self._open = {}
+        # The id of the span which started tracemalloc, if this did
+        self._started_by = None
+        # The highest peak tracemalloc has reported, where it cannot be reset
+        self._peak_seen = 0
+
+    def __getstate__(self):
+        state = Collector.__getstate__(self)
+        state['_open'] = {}
+        state['_started_by'] = None
+        return state
+
+    def _traced_memory(self):
+        '''
+        Return the current size and the peak since the last call.
+        '''
+        current, peak = tracemalloc.get_traced_memory()
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        elif peak > self._peak_seen:
+            self._peak_seen = peak
+        else:
+            # The peak was before the last call, so is not this one's
+            peak = current
+        return current, peak
+
+    def _note_peak(self):
+        '''
+        Fold the peak since the last reset into the innermost open span,
+        returning the current size.
+        '''
+        current, peak = self._traced_memory()
+        stack = self._stack()
+        if len(stack) > 1:
+            parent = self._open[id(stack[-2])]
+            parent[1] = max(parent[1], peak)
+        return current
+
+    def start(self, span):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_by = id(span)
+            self._peak_seen = 0
+        current = self._note_peak()
+        self._open[id(span)] = [current, current]
+
+    def finish(self, span):
+        current, peak = self._traced_memory()
+        start, span_peak = self._open.pop(id(span))
+        span_peak = max(span_peak, peak)
+        stack = self._stack()
+        if stack:
+            parent = self._open[id(stack[-1])]
+            parent[1] = max(parent[1], span_peak)
+        if self._started_by == id(span):
+            tracemalloc.stop()
+            self._started_by = None
+        span.set(memory_allocated=current - start, memory_peak=span_peak - start)
+        Collector.finish(self, span)
+
+    def memory(self):
+        '''
+        Return a summary of the memory used: the highest peak of any
+        outermost span, and for each stage the total allocated and the
+        highest peak, in bytes.
+        '''
+        stages = OrderedDict()
+        peak = 0
+        for span in self.spans:
+            if span.parent is None:
+                peak = max(peak, span.attributes['memory_peak'])
+            stage = stages.setdefault(span.name, {'allocated': 0, 'peak': 0})
+            stage['allocated'] += span.attributes['memory_allocated']
+            stage['peak'] = max(stage['peak'], span.attributes['memory_peak'])
+        return {'peak': peak, 'stages': stages}
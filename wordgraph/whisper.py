@@ -0,0 +1,199 @@
+# Copyright 2014 Tennessee Leeuwenburg
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+Reading of graphite's on-disk Whisper databases, without graphite itself.
+
+A Whisper file holds a header followed by one or more archives, each a
+fixed-size ring of (timestamp, value) points at its own resolution. Files are
+memory mapped and only the part of one archive covering the requested time
+range is read, into series in graphite's compact start/end/step form (see
+grapher.GraphiteCompactGraph).
+
+    > series = whisper.read('/opt/graphite/storage/whisper/servers/a/load.wsp')
+    > text = wordgraph.describe('/opt/graphite/storage/whisper/servers', source='whisper')
+'''
+
+import mmap
+import os
+import struct
+import time
+from collections import namedtuple
+
+from ._lazy import lazy_import
+
+np = lazy_import('numpy')
+
+_METADATA = struct.Struct('!2LfL')
+_ARCHIVE_INFO = struct.Struct('!3L')
+_POINT_SIZE = struct.calcsize('!Ld')
+_POINT_DTYPE = [('timestamp', '>u4'), ('value', '>f8')]
+
+EXTENSION = '.wsp'
+
+
+class ArchiveInfo(namedtuple('BaseArchiveInfo',
+        ['offset', 'seconds_per_point', 'points'])):
+
+    @property
+    def retention(self):
+        return self.seconds_per_point * self.points
+
+    @property
+    def size(self):
+        return self.points * _POINT_SIZE
+
+
+class WhisperFile(object):
+    '''
+    A memory-mapped Whisper file. Use as a context manager, or close() it.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as whisper_file:
+            self._map = mmap.mmap(whisper_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._read_header()
+        except (struct.error, ValueError):
+            self.close()
+            raise ValueError("{0} is not a valid Whisper file".format(path))
+
+    def _read_header(self):
+        (self.aggregation_type, self.max_retention, self.x_files_factor,
+                archive_count) = _METADATA.unpack_from(self._map, 0)
+        if not archive_count:
+            raise ValueError("no archives")
+        self.archives = []
+        for index in range(archive_count):
+            info = ArchiveInfo(*_ARCHIVE_INFO.unpack_from(self._map,
+                    _METADATA.size + index * _ARCHIVE_INFO.size))
+            if info.offset + info.size > len(self._map) or not info.seconds_per_point:
+                raise ValueError("archive {0} is truncated".format(index))
+            self.archives.append(info)
+
+    def close(self):
+        try:
+            self._map.close()
+        except BufferError:
+            # Arrays viewing the map are still alive, for instance in the
+            # traceback of an error; the map is closed once they are freed
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _points(self, archive, start, count):
+        '''
+        Return count points of the archive from slot start, wrapping around
+        the end of the ring. Only these points are read from the file.
+        '''
+        first = min(count, archive.points - start)
+        parts = [np.frombuffer(self._map, _POINT_DTYPE, first,
+                archive.offset + start * _POINT_SIZE)]
+        if first < count:
+            parts.append(np.frombuffer(self._map, _POINT_DTYPE, count - first,
+                    archive.offset))
+        return parts
+
+    def fetch(self, from_time=None, until_time=None, now=None):
+        '''
+        Return (start, step, values) for the period from from_time to
+        until_time (unix times, defaulting to the whole retention period and
+        now), read from the finest archive which covers all of it. Missing
+        points are NaN.
+        '''
+        if now is None:
+            now = int(time.time())
+        oldest = now - self.max_retention
+        from_time = oldest if from_time is None else max(int(from_time), oldest)
+        until_time = now if until_time is None else min(int(until_time), now)
+        if from_time > until_time:
+            raise ValueError("Invalid time interval: from time {0} is after "
+                    "until time {1}".format(from_time, until_time))
+
+        for archive in self.archives:
+            if archive.retention >= now - from_time:
+                break
+        step = archive.seconds_per_point
+        from_interval = from_time - from_time % step + step
+        until_interval = until_time - until_time % step + step
+        if from_interval == until_interval:
+            until_interval += step
+        count = (until_interval - from_interval) // step
+
+        base = self._points(archive, 0, 1)[0]['timestamp'][0]
+        values = np.full(count, np.nan)
+        if base:
+            start = ((from_interval - int(base)) // step) % archive.points
+            filled = 0
+            # A range longer than the archive (possible for the coarsest one)
+            # reads the ring more than once; timestamps sort out which apply
+            while filled < count:
+                size = min(count - filled, archive.points)
+                for part in self._points(archive, start, size):
+                    expected = from_interval + step * np.arange(
+                            filled, filled + len(part))
+                    current = part['timestamp'] == expected
+                    values[filled:filled + len(part)][current] = part['value'][current]
+                    filled += len(part)
+                start = (start + size) % archive.points
+        return from_interval, step, values
+
+
+def metric_name(path, root=None):
+    '''
+    The graphite metric name of a Whisper file: its path relative to root,
+    with directories separated by dots.
+    '''
+    if root is not None:
+        path = os.path.relpath(path, root)
+    if path.endswith(EXTENSION):
+        path = path[:-len(EXTENSION)]
+    return path.replace(os.sep, '.')
+
+
+def read(path, from_time=None, until_time=None, now=None, name=None):
+    '''
+    Read one Whisper file into a compact series dict, with keys name, start,
+    end, step and values. See WhisperFile.fetch.
+    '''
+    with WhisperFile(path) as whisper_file:
+        start, step, values = whisper_file.fetch(from_time, until_time, now)
+    return {
+        'name': metric_name(os.path.basename(path)) if name is None else name,
+        'start': start,
+        'end': start + step * len(values),
+        'step': step,
+        'values': values,
+    }
+
+
+def walk(directory, from_time=None, until_time=None, now=None):
+    '''
+    Yield a compact series dict for every Whisper file under directory, in
+    sorted order, named by its path relative to directory.
+    '''
+    if now is None:
+        now = int(time.time())
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for filename in sorted(files):
+            if filename.endswith(EXTENSION):
+                path = os.path.join(root, filename)
+                yield read(path, from_time, until_time, now,
+                        name=metric_name(path, directory))